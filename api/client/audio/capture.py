@@ -0,0 +1,85 @@
+import asyncio
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+import pvrecorder
+
+
+class CaptureThread(threading.Thread):
+    """
+    Captura unica del microfono durante toda la vida del proceso.
+
+    Un solo PvRecorder alimenta un buffer circular con los ultimos frames y
+    reparte cada frame a los consumidores suscritos (wake word, grabacion),
+    evitando abrir y cerrar el microfono entre etapas. Los frames se entregan
+    como arreglos int16 de NumPy, convertidos una sola vez al capturarlos.
+    Si la captura se detiene, cada consumidor recibe None.
+    """
+
+    def __init__(self, device_index, frame_length=512, ring_seconds=2.0):
+        super().__init__(daemon=True)
+        self.recorder = pvrecorder.PvRecorder(device_index=device_index, frame_length=frame_length)
+        self.sample_rate = self.recorder.sample_rate
+        self.frame_length = frame_length
+
+        ring_frames = max(1, int(ring_seconds * self.sample_rate / frame_length))
+        self.ring = deque(maxlen=ring_frames)
+        self.consumers = {}  # cola -> funcion para encolar desde este hilo
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+
+    def frames_for(self, seconds):
+        """
+        Cantidad de frames que equivalen a `seconds` de audio.
+        """
+        return int(seconds * self.sample_rate / self.frame_length)
+
+    def subscribe(self, preroll_frames=0, loop=None):
+        """
+        Devuelve una cola que recibe todos los frames desde ahora, precargada
+        con los ultimos `preroll_frames` frames del buffer circular.
+        Si se pasa `loop`, la cola es una asyncio.Queue de ese loop
+        (y debe llamarse desde el mismo loop).
+        """
+        if loop is None:
+            frames = queue.Queue()
+            put = frames.put
+        else:
+            frames = asyncio.Queue()
+            put = lambda frame: loop.call_soon_threadsafe(frames.put_nowait, frame)
+
+        with self.lock:
+            if preroll_frames > 0:
+                for frame in list(self.ring)[-preroll_frames:]:
+                    frames.put_nowait(frame)
+            self.consumers[frames] = put
+        return frames
+
+    def unsubscribe(self, frames):
+        with self.lock:
+            self.consumers.pop(frames, None)
+
+    def run(self):
+        self.recorder.start()
+        self.running.set()
+        try:
+            while self.running.is_set():
+                frame = np.array(self.recorder.read(), dtype=np.int16)
+                with self.lock:
+                    self.ring.append(frame)
+                    for put in self.consumers.values():
+                        put(frame)
+        except Exception as e:
+            print(f"Error en la captura de audio: {e}")
+        finally:
+            self.running.clear()
+            with self.lock:
+                for put in self.consumers.values():
+                    put(None)
+            self.recorder.stop()
+            self.recorder.delete()
+
+    def stop(self):
+        self.running.clear()
@@ -0,0 +1,28 @@
+from audio.playback import decode_wav, resample
+
+
+class EarconBank:
+    """
+    Sonidos de aviso (inicio, fin, encendido, error) decodificados una sola
+    vez al arrancar y reproducidos desde memoria por el reproductor compartido.
+    """
+
+    def __init__(self, player, files):
+        self.player = player
+        self.sounds = {}
+        for name, path in files.items():
+            with open(path, 'rb') as f:
+                samples, rate = decode_wav(f.read())
+            self.sounds[name] = resample(samples, rate, player.sample_rate)
+
+    def play(self, name):
+        """
+        Reproduce el sonido sin bloquear.
+        """
+        sound = self.sounds.get(name)
+        if sound is not None:
+            self.player.play_cue(sound)
+
+    def duration(self, name):
+        sound = self.sounds.get(name)
+        return 0.0 if sound is None else len(sound) / self.player.sample_rate
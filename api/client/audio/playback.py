@@ -0,0 +1,195 @@
+import io
+import threading
+import wave
+from collections import deque
+
+import numpy as np
+import sounddevice as sd
+
+
+def decode_wav(data):
+    """
+    Decodifica un WAV en memoria a PCM int16 mono.
+    Devuelve (muestras, frecuencia).
+    """
+    with wave.open(io.BytesIO(data), 'rb') as wf:
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        if wf.getsampwidth() != 2:
+            raise ValueError("Solo se soporta audio de 16 bits")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+def resample(samples, src_rate, dst_rate):
+    """
+    Cambia la frecuencia de muestreo por interpolacion lineal.
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    length = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.linspace(0, len(samples) - 1, length)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+
+class AudioPlayer:
+    """
+    Salida de audio de larga vida: un unico stream de PortAudio que se
+    alimenta desde un buffer de jitter. Los chunks de la respuesta se
+    reproducen a medida que llegan, sin archivos temporales ni procesos.
+
+    Ademas mezcla sonidos cortos (cues) por encima de la respuesta, sin
+    bloquear a quien los pide.
+    """
+
+    def __init__(self, sample_rate=22050, device=None, jitter_ms=60, blocksize=512, on_drained=None, on_started=None):
+        self.sample_rate = sample_rate
+        # Se llama (desde el hilo de audio) cuando termina de sonar una respuesta
+        self.on_drained = on_drained
+        # Se llama (desde el hilo de audio) cuando empieza a sonar una respuesta
+        self.on_started = on_started
+        # Audio minimo acumulado antes de empezar a sonar (evita cortes al inicio)
+        self.jitter_samples = int(sample_rate * jitter_ms / 1000)
+
+        self.queue = deque()
+        self.offset = 0      # muestras ya leidas del primer bloque de la cola
+        self.buffered = 0    # muestras pendientes en la cola
+        self.priming = False
+        self.started = False
+        self.ended = True
+        self.cues = []       # [muestras, offset] de los cues sonando
+        self.lock = threading.Lock()
+        self.drained = threading.Event()
+        self.drained.set()
+
+        self.stream = sd.RawOutputStream(
+            samplerate=sample_rate,
+            channels=1,
+            dtype='int16',
+            blocksize=blocksize,
+            device=device,
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def start_stream(self):
+        """
+        Prepara la reproduccion de una nueva respuesta.
+        """
+        with self.lock:
+            self.queue.clear()
+            self.offset = 0
+            self.buffered = 0
+            self.priming = True
+            self.started = False
+            self.ended = False
+            self.drained.clear()
+
+    def feed(self, samples):
+        """
+        Encola PCM int16 mono a la frecuencia del reproductor.
+        """
+        if len(samples) == 0:
+            return
+        with self.lock:
+            self.queue.append(samples)
+            self.buffered += len(samples)
+
+    def feed_wav(self, data):
+        """
+        Encola un bloque WAV, adaptando canales y frecuencia si es necesario.
+        """
+        samples, rate = decode_wav(data)
+        self.feed(resample(samples, rate, self.sample_rate))
+
+    def end_stream(self):
+        """
+        Indica que no llegaran mas chunks de la respuesta actual.
+        """
+        with self.lock:
+            self.ended = True
+            self.priming = False
+            if self.buffered == 0:
+                self._set_drained()
+
+    def stop(self):
+        """
+        Corta la reproduccion en curso descartando lo que quede en el buffer.
+        """
+        with self.lock:
+            self.queue.clear()
+            self.offset = 0
+            self.buffered = 0
+            self.ended = True
+            self.priming = False
+            self.drained.set()
+
+    def wait_drained(self, timeout=None):
+        """
+        Espera a que termine de sonar la respuesta actual.
+        """
+        return self.drained.wait(timeout)
+
+    def is_playing(self):
+        return not self.drained.is_set()
+
+    def play_cue(self, samples):
+        """
+        Mezcla un sonido corto (ya a la frecuencia del reproductor) y retorna de inmediato.
+        """
+        with self.lock:
+            self.cues.append([samples, 0])
+
+    def cue_active(self):
+        return bool(self.cues)
+
+    def _set_drained(self):
+        if not self.drained.is_set():
+            self.drained.set()
+            if self.on_drained is not None:
+                self.on_drained()
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+
+    def _callback(self, outdata, frames, time_info, status):
+        out = np.zeros(frames, dtype=np.int16)
+
+        with self.lock:
+            if self.priming and self.buffered >= self.jitter_samples:
+                self.priming = False
+
+            written = 0
+            while not self.priming and written < frames and self.queue:
+                block = self.queue[0]
+                count = min(frames - written, len(block) - self.offset)
+                out[written:written + count] = block[self.offset:self.offset + count]
+                written += count
+                self.offset += count
+                self.buffered -= count
+                if self.offset >= len(block):
+                    self.queue.popleft()
+                    self.offset = 0
+
+            if written and not self.started:
+                self.started = True
+                if self.on_started is not None:
+                    self.on_started()
+
+            if self.ended and self.buffered == 0:
+                self._set_drained()
+
+            if self.cues:
+                mixed = out.astype(np.int32)
+                for cue in self.cues:
+                    samples, offset = cue
+                    count = min(frames, len(samples) - offset)
+                    mixed[:count] += samples[offset:offset + count]
+                    cue[1] = offset + count
+                self.cues = [cue for cue in self.cues if cue[1] < len(cue[0])]
+                out = np.clip(mixed, -32768, 32767).astype(np.int16)
+
+        outdata[:] = out.tobytes()
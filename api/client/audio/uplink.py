@@ -0,0 +1,92 @@
+import zlib
+
+
+# Codecs soportados para el envio de audio al servidor
+CODEC_PCM = "pcm"     # PCM int16 sin comprimir
+CODEC_ZLIB = "zlib"   # PCM int16 comprimido sin perdida
+CODEC_OPUS = "opus"   # Opus (con perdida), requiere opuslib
+
+OPUS_FRAME_MS = 20
+
+
+class UplinkEncoder:
+    """
+    Agrupa los frames del microfono en paquetes de `batch_ms` milisegundos,
+    los comprime con el codec elegido y los envia numerados al servidor.
+
+    Cada paquete es un diccionario:
+    {'seq': n, 'codec': ..., 'rate': ..., 'samples': ..., 'data': bytes | [bytes]}
+    """
+
+    def __init__(self, send, codec=CODEC_ZLIB, batch_ms=160, sample_rate=16000):
+        self.send = send
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.batch_bytes = int(sample_rate * batch_ms / 1000) * 2
+        self.pending = bytearray()
+        self.seq = 0
+
+        self.opus_encoder = None
+        if codec == CODEC_OPUS:
+            import opuslib
+            self.opus_encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+            self.opus_frame_bytes = int(sample_rate * OPUS_FRAME_MS / 1000) * 2
+        elif codec not in (CODEC_PCM, CODEC_ZLIB):
+            raise ValueError(f"Codec de uplink desconocido: {codec}")
+
+    def push(self, pcm):
+        """
+        Agrega PCM int16 al paquete en curso y lo envia si ya esta completo.
+        Acepta bytes o cualquier buffer int16 (por ejemplo un arreglo de NumPy),
+        que se copia directo sin reempaquetar.
+        """
+        self.pending.extend(pcm)
+        if len(self.pending) >= self.batch_bytes:
+            self._send_pending()
+
+    def flush(self):
+        """
+        Envia lo que quede pendiente (al terminar la grabacion).
+        """
+        if self.pending:
+            self._send_pending(final=True)
+
+    def _send_pending(self, final=False):
+        pcm = bytes(self.pending)
+        self.pending = bytearray()
+        if self.codec == CODEC_OPUS:
+            data, pcm = self._encode_opus(pcm, final)
+            if not data:
+                return
+        elif self.codec == CODEC_ZLIB:
+            data = zlib.compress(pcm, 1)
+        else:
+            data = pcm
+
+        self.send({
+            'seq': self.seq,
+            'codec': self.codec,
+            'rate': self.sample_rate,
+            'samples': len(pcm) // 2,
+            'data': data,
+        })
+        self.seq += 1
+
+    def _encode_opus(self, pcm, final):
+        """
+        Opus solo acepta frames de duracion fija: se codifican los frames
+        completos y el resto queda para el proximo paquete (o se rellena
+        con silencio si es el ultimo).
+        """
+        frame_bytes = self.opus_frame_bytes
+        if final and len(pcm) % frame_bytes:
+            pcm += bytes(frame_bytes - len(pcm) % frame_bytes)
+
+        usable = len(pcm) - len(pcm) % frame_bytes
+        samples_per_frame = frame_bytes // 2
+        frames = [
+            self.opus_encoder.encode(pcm[i:i + frame_bytes], samples_per_frame)
+            for i in range(0, usable, frame_bytes)
+        ]
+        self.pending = bytearray(pcm[usable:])
+        return frames, pcm[:usable]
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+# Modos de deteccion de voz disponibles
+VAD_FIXED = "fixed"        # umbral fijo de amplitud (comportamiento original)
+VAD_ADAPTIVE = "adaptive"  # energia sobre un piso de ruido que se adapta
+VAD_WEBRTC = "webrtc"      # WebRTC VAD, requiere webrtcvad
+
+
+def frame_peak(frame):
+    """
+    Amplitud maxima del frame (int16), calculada de forma vectorizada.
+    """
+    return int(np.abs(frame.astype(np.int32)).max())
+
+def frame_rms(frame):
+    """
+    Energia RMS del frame (int16).
+    """
+    samples = frame.astype(np.float32)
+    return float(np.sqrt(np.dot(samples, samples) / len(samples)))
+
+
+class FixedThresholdVAD:
+    """
+    Considera voz todo frame cuyo pico supere el umbral configurado.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def is_speech(self, frame):
+        return frame_peak(frame) >= self.threshold
+
+
+class AdaptiveEnergyVAD:
+    """
+    Compara la energia RMS del frame contra un piso de ruido estimado con
+    una media movil sobre los frames sin voz. Se ajusta solo al ambiente
+    en vez de depender de un umbral fijo.
+    """
+
+    def __init__(self, ratio=3.0, min_rms=200.0, alpha=0.05, initial_floor=300.0):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.alpha = alpha
+        self.noise_floor = initial_floor
+
+    def is_speech(self, frame):
+        rms = frame_rms(frame)
+        speech = rms > max(self.min_rms, self.noise_floor * self.ratio)
+        if not speech:
+            self.noise_floor += self.alpha * (rms - self.noise_floor)
+        return speech
+
+
+class WebRtcVAD:
+    """
+    WebRTC VAD sobre sub-frames de 20 ms. Las muestras que no completan un
+    sub-frame se guardan para el siguiente frame.
+    """
+
+    def __init__(self, aggressiveness=2, sample_rate=16000):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+        self.subframe = sample_rate // 50
+        self.carry = np.zeros(0, dtype=np.int16)
+
+    def is_speech(self, frame):
+        samples = np.concatenate((self.carry, frame)) if len(self.carry) else frame
+        usable = len(samples) - len(samples) % self.subframe
+        self.carry = samples[usable:]
+
+        return any(
+            self.vad.is_speech(samples[i:i + self.subframe].tobytes(), self.sample_rate)
+            for i in range(0, usable, self.subframe)
+        )
+
+
+def create_vad(mode, threshold, aggressiveness=2, sample_rate=16000):
+    """
+    Crea el detector de voz segun el modo configurado.
+    """
+    if mode == VAD_FIXED:
+        return FixedThresholdVAD(threshold)
+    if mode == VAD_ADAPTIVE:
+        return AdaptiveEnergyVAD()
+    if mode == VAD_WEBRTC:
+        return WebRtcVAD(aggressiveness, sample_rate)
+    raise ValueError(f"Modo de VAD desconocido: {mode}")
@@ -4,15 +4,16 @@ import pvrecorder
 from dotenv import load_dotenv
 import os
 import struct
-import subprocess
 import time
 
+from audio.playback import AudioPlayer
+from audio.earcons import EarconBank
+
 
 load_dotenv()
 # Configuracion API
 URL_SERVER = os.getenv("URL_SERVER")
 API_TOKEN = os.getenv("API_TOKEN")
-AUDIO_TEMP_FILE = "stream_audio.wav"
 
 # Configuracion Porcupine
 ACCES_KEY = os.getenv("ACCESS_KEY")
@@ -28,9 +29,14 @@ MAX_DURATION_SECONDS = 15
 START_SOUND_FILE = "config/sound/start_sound.wav"
 FINISH_SOUND_FILE = "config/sound/finish_sound.wav"
 
+# Configuracion salida de audio
+OUTPUT_SAMPLE_RATE = 22050
+
 # Configuracion SocketIO
 sio = socketio.Client(reconnection=True, reconnection_attempts=5, reconnection_delay=1, request_timeout=20)
 isBusy = False
+player = None
+earcons = None
 
 @sio.event
 
@@ -49,25 +55,44 @@ def response(data):
     if 'error'  in data:
         print(f"Error recibido del servidor: {data['error']}")
 
+def wait_playback_end():
+    global isBusy
+    player.wait_drained()
+    isBusy = False
+
 @sio.event
 def audio_response(data):
 
     global isBusy
 
     print("Respuesta de audio recibida del servidor.")
-
     try:
-        with open(AUDIO_TEMP_FILE, 'wb') as f:
-            f.write(data)
+        player.start_stream()
+        player.feed_wav(data)
+        player.end_stream()
+        sio.start_background_task(wait_playback_end)
+    except Exception as e:
+        isBusy = False
+        print(f"Error al reproducir audio: {e}")
 
-        subprocess.run(["aplay", AUDIO_TEMP_FILE], stderr=subprocess.DEVNULL)
+@sio.event
+def audio_response_chunk(data):
+    """
+    Recibe la respuesta por partes (una por oracion) y las reproduce a medida que llegan.
+    """
+    global isBusy
 
+    try:
+        if data.get('seq') == 0:
+            player.start_stream()
+        if data.get('audio'):
+            player.feed_wav(data['audio'])
+        if data.get('final'):
+            player.end_stream()
+            sio.start_background_task(wait_playback_end)
     except Exception as e:
+        isBusy = False
         print(f"Error al reproducir audio: {e}")
-    finally:
-        if os.path.exists(AUDIO_TEMP_FILE):
-            os.remove(AUDIO_TEMP_FILE)
-    isBusy = False
 
 
 def record_and_stream():
@@ -107,7 +132,7 @@ def record_and_stream():
                 print("Silencio detectado, finalizando grabacion.")
                 break
 
-        subprocess.run(["aplay", FINISH_SOUND_FILE], stderr=subprocess.DEVNULL)
+        earcons.play('finish')
         print("Grabación finalizada.")
         sio.emit('end_of_audio')
 
@@ -141,7 +166,7 @@ def detect_wake_word():
 
             if output >= 0:
                 print("Wake word detectada!")
-                subprocess.run(["aplay", START_SOUND_FILE], stderr=subprocess.DEVNULL)
+                earcons.play('start')
                 break
     except KeyboardInterrupt:
         print("Interrumpido por el usuario")
@@ -155,6 +180,8 @@ def detect_wake_word():
 
 if __name__ == "__main__":
     try:
+        player = AudioPlayer(sample_rate=OUTPUT_SAMPLE_RATE)
+        earcons = EarconBank(player, {'start': START_SOUND_FILE, 'finish': FINISH_SOUND_FILE})
         fullUrl = f"https://{URL_SERVER}"
         print(f"Conectando a la API... ")
 
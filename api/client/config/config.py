@@ -14,8 +14,10 @@ class Config:
     access_key: str
     microphone_index: int
 
-    # General
-    audio_temp_file: str = "stream_audio.wav"
+    # Salida de audio
+    output_device: int | None = None  # None usa el dispositivo por defecto
+    output_sample_rate: int = 22050
+    playback_jitter_ms: int = 60
 
     # Rutas base
     base_dir: Path = Path(__file__).resolve().parents[1]  # .../api/client
@@ -25,9 +27,17 @@ class Config:
     porcupine_model_path: Path | None = None
 
     # VAD
-    silence_threshold: int = 2500
+    vad_mode: str = "adaptive"  # fixed | adaptive | webrtc
+    silence_threshold: int = 2500  # umbral de amplitud del modo fixed
+    vad_aggressiveness: int = 2  # 0-3, modo webrtc
+    vad_hangover_ms: int = 300  # silencio que se sigue enviando alrededor de la voz
     silence_limit_seconds: float = 1.0
     max_duration_seconds: float = 15.0
+    preroll_ms: int = 300  # audio previo a la wake word que se incluye en la grabacion
+
+    # Uplink de audio
+    uplink_codec: str = "zlib"  # pcm | zlib | opus
+    uplink_batch_ms: int = 160  # milisegundos de audio por paquete
 
     # Sonidos
     start_sound_file: Path | None = None
@@ -35,14 +45,15 @@ class Config:
     on_sound_file: Path | None = None
     error_sound_file: Path | None = None
 
+    # Pantalla (screen/main.py)
+    screen_socket: str = "/tmp/kubibot-screen.sock"  # Debe coincidir con SOCKET_PANTALLA
+
     # Arduino
     port: str = "/dev/ttyACM0"
-    fserial: int = 9600
+    fserial: int = 115200  # Debe coincidir con SERIAL_BAUD en arduino.ino
     cooldown_seconds: int = 60
-    stop_command: str = "S"
-    resume_command: str = "R"
-    stop_handshake: str = "K"
     handshake_timeout_seconds: float = 3.0
+    telemetry_size: int = 64  # lecturas de distancia/estado que se conservan
 
     # Watchdogs
     connect_retry_base_delay_seconds: int = 1
@@ -87,4 +98,9 @@ class Config:
             api_token=os.getenv("API_TOKEN"),
             access_key=os.getenv("ACCESS_KEY"),
             microphone_index=microphone_index,
+            vad_mode=os.getenv("VAD_MODE", cls.vad_mode),
+            uplink_codec=os.getenv("UPLINK_CODEC", cls.uplink_codec),
+            uplink_batch_ms=int(os.getenv("UPLINK_BATCH_MS", cls.uplink_batch_ms)),
+            output_device=int(os.getenv("OUTPUT_DEVICE")) if os.getenv("OUTPUT_DEVICE") else None,
+            screen_socket=os.getenv("SCREEN_SOCKET", cls.screen_socket),
         )
@@ -1,14 +1,18 @@
+import asyncio
+import aiohttp
 import socketio
 import pvporcupine
-import pvrecorder
-import os
-import struct
-import subprocess
-import time
-import serial
-import datetime
+from collections import deque
 
 from config.config import Config # Importar la clase Config desde el módulo config
+from audio.uplink import UplinkEncoder
+from audio.playback import AudioPlayer
+from audio.earcons import EarconBank
+from audio.capture import CaptureThread
+from audio.vad import create_vad
+from serial_link.link import ArduinoLink
+from screen_link.publisher import FacePublisher
+from tracing.trace import TurnTrace
 
 # Cargar y validar configuración
 config = Config.from_env()
@@ -16,7 +20,6 @@ config = Config.from_env()
 # Configuracion API
 URL_SERVER = config.server_url
 API_TOKEN = config.api_token
-AUDIO_TEMP_FILE = config.audio_temp_file
 
 # Configuracion Porcupine
 ACCES_KEY = config.access_key
@@ -27,8 +30,16 @@ MODEL_PATH = str(config.porcupine_model_path)
 
 # Configuracion Voice Active Detection
 SILENCE_THRESHOLD = config.silence_threshold
+VAD_MODE = config.vad_mode
+VAD_AGGRESSIVENESS = config.vad_aggressiveness
+VAD_HANGOVER_SECONDS = config.vad_hangover_ms / 1000
 SILENCE_LIMIT_SECONDS = config.silence_limit_seconds
 MAX_DURATION_SECONDS = config.max_duration_seconds
+PREROLL_SECONDS = config.preroll_ms / 1000
+
+# Configuracion uplink de audio
+UPLINK_CODEC = config.uplink_codec
+UPLINK_BATCH_MS = config.uplink_batch_ms
 
 # Configuraciones generales
 START_SOUND_FILE = str(config.start_sound_file)
@@ -36,286 +47,489 @@ FINISH_SOUND_FILE = str(config.finish_sound_file)
 ON_SOUND_FILE = str(config.on_sound_file)
 ERROR_SOUND_FILE = str(config.error_sound_file)
 
+# Configuracion salida de audio
+OUTPUT_DEVICE = config.output_device
+OUTPUT_SAMPLE_RATE = config.output_sample_rate
+PLAYBACK_JITTER_MS = config.playback_jitter_ms
+
+# Configuracion pantalla
+SCREEN_SOCKET = config.screen_socket
+
 # Configuracion SocketIO
-sio = socketio.Client(reconnection=True, reconnection_attempts=5, reconnection_delay=1, request_timeout=20)
-isBusy = False
+# La reconexion la maneja connection_watchdog con backoff exponencial
+sio = socketio.AsyncClient(reconnection=False, request_timeout=20)
 
 # Configuracion comunicacion serial
 PORT = config.port
 FSERIAL = config.fserial  # Frecuencia serial arduino
 COOLDOWN = config.cooldown_seconds   # Segundos de cooldown para retornar la senhal de movimiento
-STOP_COMMAND = config.stop_command
-RESUME_COMMAND = config.resume_command
-STOP_HANDSHAKE = config.stop_handshake
 HANDSHAKE_TIMEOUT = config.handshake_timeout_seconds
+TELEMETRY_SIZE = config.telemetry_size
 
 # Configuracion Watchdogs
 CONNECT_RETRY_BASE_DELAY = config.connect_retry_base_delay_seconds
 CONNECT_RETRY_MAX_DELAY = config.connect_retry_max_delay_seconds
 RESPONSE_TIMEOUT_SECONDS = config.response_timeout_seconds
 
+# Estados del cliente
+STATE_IDLE = "idle"            # esperando la wake word
+STATE_LISTENING = "listening"  # grabando el comando
+STATE_THINKING = "thinking"    # esperando la respuesta del servidor
+STATE_SPEAKING = "speaking"    # reproduciendo la respuesta
+
+loop = None
 arduino = None
-isOnUse = False
-lastStopTime = None
-elapsedTime = 0
+player = None
+earcons = None
+capture = None
+porcupine = None
+
+clientState = STATE_IDLE
+turnTask = None           # Tarea del turno en curso
+turnId = 0                # Numero del turno en curso, el servidor lo devuelve en sus respuestas
+turnDone = None           # Future que se resuelve al terminar la respuesta del turno
+resumeTimer = None        # Timer del cooldown para reanudar el movimiento
+turnTrace = None          # Traza de tiempos del turno en curso
+turnEmotion = None        # Emocion que el servidor asigno a la respuesta en curso
+face = None               # Publica el estado a la pantalla
+disconnectedEvent = None
+
+def set_state(state):
+    global clientState
+    if state != clientState:
+        print(f"Estado: {clientState} -> {state}")
+        clientState = state
+        face.publish(state, turnEmotion)
+
+def set_emotion(emotion):
+    global turnEmotion
+    if emotion and emotion != turnEmotion:
+        turnEmotion = emotion
+        face.publish(clientState, turnEmotion)
+
+def is_current_turn(data):
+    return data.get('turn') == turnId
+
+def mark_trace(name):
+    if turnTrace is not None:
+        turnTrace.mark(name)
+
+def on_playback_started():
+    mark_trace("playback_start")
+    # Desde aqui la pantalla recorre la envolvente contra su propio reloj
+    face.publish(clientState, turnEmotion, reproduciendo=True)
+
+def finish_turn(error=None):
+    """
+    Resuelve el future del turno en curso (la respuesta termino o fallo).
+    """
+    if turnDone is not None and not turnDone.done():
+        turnDone.set_result(error)
 
 @sio.event
-def connect():
+async def connect():
     print("Conectado al servidor de la API")
 
 @sio.event
-def disconnect():
+async def disconnect():
     print("Desconectado del servidor de la API")
+    finish_turn("Desconectado del servidor")
+    disconnectedEvent.set()
 
 
 @sio.event
-def response(data):
-    global isBusy
-    if 'respuesta_texto' in data:
-        texto = data['respuesta_texto']
+async def response(data):
+    if not is_current_turn(data):
+        return
+    mark_trace("response_received")
+    set_emotion(data.get('emocion'))
+    if 'respuesta' in data:
+        texto = data['respuesta']
         print(f"Respuesta de texto recibida: {texto}")
     if 'error'  in data:
-        isBusy = False
         print(f"Error recibido del servidor: {data['error']}")
+        # Si la frase de error sigue sonando, el turno termina cuando se vacie el reproductor
+        if not player.is_playing():
+            finish_turn(data['error'])
 
+@sio.event
+async def partial_transcript(data):
+    print(f"Transcripción parcial: {data.get('texto')}")
 
 @sio.event
-def audio_response(data):
+async def busy(data):
+    # El servidor esta saturado y el turno espera en su cola
+    print(f"Servidor ocupado, turno en posición {data.get('posicion')} de la cola.")
 
-    global isBusy
+@sio.event
+async def audio_response(data):
 
     print("Respuesta de audio recibida del servidor.")
+    try:
+        player.start_stream()
+        player.feed_wav(data)
+        player.end_stream()
+    except Exception as e:
+        print(f"Error al reproducir audio: {e}")
+        finish_turn(str(e))
+
+@sio.event
+async def audio_response_chunk(data):
+    """
+    Recibe la respuesta por partes (una por oracion) y las encola en el
+    reproductor, que empieza a sonar apenas hay audio suficiente.
+    El ultimo chunk viene marcado con 'final'; el turno termina cuando
+    el reproductor avisa que se vacio.
+    """
+    if not is_current_turn(data):
+        return  # Respuesta de un turno interrumpido
+    mark_trace("response_received")
 
     try:
-        with open(AUDIO_TEMP_FILE, 'wb') as f:
-            f.write(data)
+        if data.get('seq') == 0:
+            player.start_stream()
+
+        if data.get('audio'):
+            print(f"Chunk de audio {data.get('seq')} recibido del servidor.")
+            set_emotion(data.get('emocion'))
+            set_state(STATE_SPEAKING)
+            player.feed_wav(data['audio'])
+            if data.get('envolvente'):
+                # La pantalla encola la envolvente del chunk a continuacion de la anterior
+                face.publish(STATE_SPEAKING, turnEmotion, envolvente=list(data['envolvente']))
 
-        subprocess.run(["aplay", AUDIO_TEMP_FILE], stderr=subprocess.DEVNULL)
+        if data.get('final'):
+            player.end_stream()
 
     except Exception as e:
-        isBusy = False
         print(f"Error al reproducir audio: {e}")
-    finally:
-        if os.path.exists(AUDIO_TEMP_FILE):
-            os.remove(AUDIO_TEMP_FILE)
-    isBusy = False
-
-def record_and_stream():
-
-    global isBusy
+        finish_turn(str(e))
 
-    isBusy = True
+async def record_and_stream(commandFrames):
+    """
+    Envia al servidor los frames de la cola de grabacion (que ya incluye el
+    pre-roll) hasta detectar silencio o alcanzar la duracion maxima.
+    Devuelve True si el audio se envio completo.
+    """
     print("Grabando comando de voz...")
-    recorder = None
 
     try:
-        recorder = pvrecorder.PvRecorder(device_index=MICROPHONE_INDEX, frame_length = 512)
-        recorder.start()
-
-        maxChunks = int(recorder.sample_rate * MAX_DURATION_SECONDS / recorder.frame_length)
-        silenceLimit = int(recorder.sample_rate * SILENCE_LIMIT_SECONDS / recorder.frame_length)
+        maxChunks = capture.frames_for(MAX_DURATION_SECONDS)
+        silenceLimit = capture.frames_for(SILENCE_LIMIT_SECONDS)
+        hangoverFrames = capture.frames_for(VAD_HANGOVER_SECONDS)
+        prerollFrames = capture.frames_for(PREROLL_SECONDS)
 
         silenceCounter = 0
         chunksRecorded= 0
         voiceDetected = False
+        vad = create_vad(VAD_MODE, SILENCE_THRESHOLD, VAD_AGGRESSIVENESS, capture.sample_rate)
+        # Frames de silencio retenidos antes de la voz (se envian si empieza a hablar)
+        leadingSilence = deque(maxlen=max(1, hangoverFrames))
+
+        # Los frames se agrupan y comprimen antes de enviarse
+        outbox = deque()
+        uplink = UplinkEncoder(
+            outbox.append,
+            codec=UPLINK_CODEC,
+            batch_ms=UPLINK_BATCH_MS,
+            sample_rate=capture.sample_rate
+        )
+
+        async def send_packets():
+            while outbox:
+                await sio.emit('audio_chunk', outbox.popleft())
+                mark_trace("first_chunk_sent")
 
         while chunksRecorded < maxChunks:
-            cooldown_tick()
-            frame = recorder.read()
-            packedFrame = struct.pack("h" * len(frame), *frame)
+            frame = await asyncio.wait_for(commandFrames.get(), timeout=1.0)
+            if frame is None:
+                raise RuntimeError("La captura de audio se detuvo")
 
-            maxAmplitude = max(abs(sample) for sample in frame)
-            if maxAmplitude < SILENCE_THRESHOLD:
+            # Mientras suena un cue el microfono lo capta: no cuenta como voz
+            isSpeech = vad.is_speech(frame) and not player.cue_active()
+            if not isSpeech:
                 silenceCounter += 1 # Hay silencio
             else:
                 silenceCounter = 0
+                if not voiceDetected:
+                    # Se envia el silencio inmediatamente anterior a la voz
+                    for silentFrame in leadingSilence:
+                        uplink.push(silentFrame)
+                    leadingSilence.clear()
                 voiceDetected = True # Detectada voz
 
-            sio.emit('audio_chunk', packedFrame)
+            # El pre-roll y lo captado mientras suena el cue de inicio siempre se
+            # envian: ahi pueden estar las primeras silabas del comando
+            keepLeading = chunksRecorded < prerollFrames or player.cue_active()
+
+            # El frame se envia tal cual (buffer int16, sin reempaquetar); el
+            # silencio solo se sube dentro de la ventana de hangover
+            if not voiceDetected and keepLeading:
+                for silentFrame in leadingSilence:
+                    uplink.push(silentFrame)
+                leadingSilence.clear()
+                uplink.push(frame)
+            elif not voiceDetected:
+                leadingSilence.append(frame)
+            elif silenceCounter <= hangoverFrames:
+                uplink.push(frame)
+            await send_packets()
             chunksRecorded += 1
 
             if voiceDetected and silenceCounter > silenceLimit:
                 print("Silencio detectado, finalizando grabación.")
                 break
 
-        subprocess.run(["aplay", FINISH_SOUND_FILE], stderr=subprocess.DEVNULL)
+        uplink.flush()
+        await send_packets()
+        earcons.play('finish')
         print("Grabación finalizada.")
-        sio.emit('end_of_audio')
+        await sio.emit('end_of_audio', {'turn': turnId, 'trace': turnTrace.trace_id})
+        mark_trace("end_of_audio")
+        return True
 
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
         print(f"Error durante la grabación: {e}")
-        isBusy = False
-    finally:
-        if recorder:
-            recorder.stop()
-            recorder.delete()
-
-
+        return False
 
-def detect_wake_word():
+async def run_turn(commandFrames, trace):
     """
-    Escucha el micrófono hasta detectar la wake word.
+    Un turno completo: grabar, enviar y esperar a que termine de sonar la respuesta.
+    Puede cancelarse en cualquier punto si se vuelve a detectar la wake word.
     """
-    global isOnUse, lastStopTime, arduino, elapsedTime
+    global turnId, turnDone, turnTrace, turnEmotion
+
+    turnId += 1
+    turnDone = loop.create_future()
+    turnTrace = trace
+    turnEmotion = None
+    done = turnDone
 
-    recorder = None
-    porcupine = None
+    set_state(STATE_LISTENING)
+    stop_movement()
+    earcons.play('start')  # No bloquea: la grabacion ya esta en curso
 
     try:
-        porcupine = pvporcupine.create(
-            access_key=ACCES_KEY,
-            keyword_paths=[ARCHIVO_WAKE_WORD],
-            model_path=MODEL_PATH
-        )
+        if not await record_and_stream(commandFrames):
+            return
 
-        recorder = pvrecorder.PvRecorder(device_index=MICROPHONE_INDEX, frame_length=porcupine.frame_length)
-        recorder.start()
+        set_state(STATE_THINKING)
+        error = await asyncio.wait_for(done, timeout=RESPONSE_TIMEOUT_SECONDS)
+        if error:
+            print(f"Turno terminado con error: {error}")
 
-        print("Escuchando por la wake word...")
+    except asyncio.TimeoutError:
+        print("Tiempo de espera de respuesta excedido.")
+        player.stop()
+    finally:
+        capture.unsubscribe(commandFrames)
+        print(trace.summary())
+        if turnTask is asyncio.current_task():
+            set_state(STATE_IDLE)
 
-        while(True):
+def on_wake_word():
+    """
+    Inicia un turno nuevo. Si hay una respuesta en curso, la interrumpe (barge-in).
+    """
+    global turnTask
 
-            cooldown_tick()
+    if clientState == STATE_LISTENING:
+        return  # Ya se esta grabando un comando
 
-            frame = recorder.read()
-            output = porcupine.process(frame)
+    trace = TurnTrace()
+    trace.mark("wake_word")
 
-            if output >= 0:
-                print("Wake word detectada!")
-                # Se envia senhal de stop al arduino
+    if not sio.connected:
+        print("Sin conexión con el servidor, se ignora la wake word.")
+        earcons.play('error')
+        return
 
-                stopped = process_arduino_handshake()
-                if stopped:
-                    print("Senhal de STOP confirmada por el Arduino.")
-                else:
-                    print("No se recibio confirmacion de STOP del Arduino.")
+    # La grabacion se suscribe en el mismo instante de la deteccion para no
+    # perder las primeras silabas del comando
+    commandFrames = capture.subscribe(preroll_frames=capture.frames_for(PREROLL_SECONDS), loop=loop)
 
-                subprocess.run(["aplay", START_SOUND_FILE], stderr=subprocess.DEVNULL)
+    if turnTask is not None and not turnTask.done():
+        print("Barge-in: se interrumpe la respuesta en curso.")
+        turnTask.cancel()
+        player.stop()
 
-                isOnUse = True
-                lastStopTime = datetime.datetime.now()
-                break
+    turnTask = loop.create_task(run_turn(commandFrames, trace))
 
-    except KeyboardInterrupt:
-        print("Interrumpido por el usuario")
-    finally:
-        if recorder is not None:
-            recorder.stop()
-            recorder.delete()
-        if porcupine is not None:
-            porcupine.delete()
+async def wake_word_listener():
+    """
+    Escucha el micrófono de forma continua (tambien mientras se reproduce
+    una respuesta) y dispara un turno cada vez que detecta la wake word.
+    """
+    wakeFrames = capture.subscribe(loop=loop)
+    print("Escuchando por la wake word...")
 
-def process_arduino_handshake():
-    global arduino
+    try:
+        while True:
+            frame = await wakeFrames.get()
+            if frame is None:
+                raise RuntimeError("La captura de audio se detuvo")
 
-    if arduino is None or not arduino.is_open:
-        return False
+            if porcupine.process(frame) >= 0:
+                print("Wake word detectada!")
+                on_wake_word()
+    finally:
+        capture.unsubscribe(wakeFrames)
 
+async def process_arduino_handshake():
+    """
+    Envia STOP y espera (sin sondear) a que el hilo lector reciba su ACK.
+    """
     try:
-        arduino.reset_input_buffer()
-        arduino.write(STOP_COMMAND.encode())
-        arduino.flush()
-
-        startTime = time.time()
-        deadLine = startTime + HANDSHAKE_TIMEOUT
-        while time.time() < deadLine:
-            cooldown_tick()
-
-            b = arduino.read(1)
-            if not b:
-                continue
-            charRecieved = b.decode(errors='ignore')
-            if charRecieved == STOP_HANDSHAKE:
-                print("Handshake con Arduino exitoso.")
-                return True
+        stopped = await asyncio.wait_for(asyncio.wrap_future(arduino.request_stop()), timeout=HANDSHAKE_TIMEOUT)
+    except asyncio.TimeoutError:
         print("Timeout esperando handshake del Arduino.")
-        return False
-
+        stopped = False
     except Exception as e:
         print(f"Error durante el handshake con Arduino: {e}")
-        return False
+        stopped = False
+
+    if stopped:
+        print("Senhal de STOP confirmada por el Arduino.")
+    else:
+        print("No se recibio confirmacion de STOP del Arduino.")
+
+def stop_movement():
+    """
+    Detiene el robot (el handshake se resuelve en paralelo con el sonido de
+    inicio y la grabacion) y reprograma el timer que lo reanuda tras el cooldown.
+    """
+    global resumeTimer
+
+    loop.create_task(process_arduino_handshake())
+
+    if resumeTimer is not None:
+        resumeTimer.cancel()
+    resumeTimer = loop.call_later(COOLDOWN, resume_movement)
+
+def resume_movement():
+    global resumeTimer
+
+    resumeTimer = None
+    if arduino.is_open:
+        print("Enviando senhal de reanudacion al Arduino.")
+        try:
+            arduino.resume()
+        except Exception as e:
+            print(f"Error enviando reanudacion al Arduino: {e}")
 
 def establish_serial_connection():
-    global arduino
     try:
-        arduino = serial.Serial(PORT, FSERIAL, timeout=0.1, write_timeout=0.5)
-        time.sleep(2)  # Espera a que la conexión serial se establezca
-        arduino.write(RESUME_COMMAND.encode())
-        arduino.flush()
+        arduino.open()
         print("Conexión serial establecida con Arduino.")
     except Exception as e:
-        subprocess.run(["aplay", ERROR_SOUND_FILE], stderr=subprocess.DEVNULL)
+        earcons.play('error')
         print(f"Error al establecer conexión serial: {e}")
 
-def establish_server_conecction():
+async def server_ready():
+    """
+    Consulta /health: el servidor responde 503 mientras precarga sus modelos.
+    Un servidor sin /health se considera listo.
+    """
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
+            async with session.get(f"{URL_SERVER}/health") as resp:
+                return resp.status != 503
+    except Exception:
+        return False
+
+async def establish_server_conecction():
     delay = CONNECT_RETRY_BASE_DELAY
     while not sio.connected:
+        if not await server_ready():
+            print("El servidor aún no está listo, reintentando...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, CONNECT_RETRY_MAX_DELAY)
+            continue
         try:
             print("Intentando conectar al servidor...")
             fullUrl = URL_SERVER  # ya viene normalizada (http/https) desde Config.server_url
-            sio.connect(fullUrl, headers={'Auth': API_TOKEN})
-            sio.emit('reset_record')
-            subprocess.run(["aplay", ON_SOUND_FILE], stderr=subprocess.DEVNULL)
+            await sio.connect(fullUrl, headers={'Auth': API_TOKEN})
+            await sio.emit('reset_record')
+            earcons.play('on')
             print("Conexion Establecida.")
         except Exception as e:
             print(f"Error de reconexion: {e}")
-            subprocess.run(["aplay", ERROR_SOUND_FILE], stderr=subprocess.DEVNULL)
-            time.sleep(delay)
+            earcons.play('error')
+            await asyncio.sleep(delay)
             delay = min(delay * 2, CONNECT_RETRY_MAX_DELAY)
 
-def cooldown_tick():
-    global isOnUse, lastStopTime, elapsedTime, arduino
-
-    if not isOnUse or lastStopTime is None:
-        return
-
-    elapsedTime = (datetime.datetime.now() - lastStopTime).total_seconds()
-    #print(f"Tiempo desde ultimo STOP: {int(elapsedTime)} segundos")
+async def connection_watchdog():
+    """
+    Espera (sin sondear) a que se pierda la conexion y la restablece.
+    """
+    while True:
+        await disconnectedEvent.wait()
+        disconnectedEvent.clear()
+        print("Desconectado del servidor, intentando reconectar...")
+        await establish_server_conecction()
+
+async def main():
+    global loop, player, earcons, porcupine, capture, arduino, disconnectedEvent, face
+
+    loop = asyncio.get_running_loop()
+    disconnectedEvent = asyncio.Event()
+    face = FacePublisher(SCREEN_SOCKET)
+    face.publish(clientState)
+
+    print("Iniciando cliente Raspberry Pi...")
+    player = AudioPlayer(
+        sample_rate=OUTPUT_SAMPLE_RATE,
+        device=OUTPUT_DEVICE,
+        jitter_ms=PLAYBACK_JITTER_MS,
+        on_drained=lambda: loop.call_soon_threadsafe(finish_turn),
+        on_started=lambda: loop.call_soon_threadsafe(on_playback_started)
+    )
+    earcons = EarconBank(player, {
+        'start': START_SOUND_FILE,
+        'finish': FINISH_SOUND_FILE,
+        'on': ON_SOUND_FILE,
+        'error': ERROR_SOUND_FILE,
+    })
+
+    # Porcupine y la captura del microfono se crean una sola vez
+    porcupine = pvporcupine.create(
+        access_key=ACCES_KEY,
+        keyword_paths=[ARCHIVO_WAKE_WORD],
+        model_path=MODEL_PATH
+    )
+    capture = CaptureThread(MICROPHONE_INDEX, frame_length=porcupine.frame_length)
+    capture.start()
+
+    arduino = ArduinoLink(
+        PORT,
+        FSERIAL,
+        telemetry_size=TELEMETRY_SIZE
+    )
+
+    watchdog = None
+    try:
+        await loop.run_in_executor(None, establish_serial_connection)
+        await establish_server_conecction()
+        watchdog = asyncio.create_task(connection_watchdog())
 
-    if elapsedTime < COOLDOWN:
-        return # Si todavia no ha pasado el cooldown, no hacer nada
+        await wake_word_listener()
 
-    isOnUse = False
-    lastStopTime = None
-    if arduino is not None and arduino.is_open:
-        print("Enviando senhal de reanudacion al Arduino.")
-        arduino.write(RESUME_COMMAND.encode())
-        arduino.flush()
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+        if sio.connected:
+            await sio.disconnect()
+        capture.stop()
+        porcupine.delete()
+        arduino.close()
+        face.close()
 
 if __name__ == "__main__":
     try:
-        print("Iniciando cliente Raspberry Pi...")
-        establish_serial_connection()
-        establish_server_conecction()
-
-        while True:
-
-            if not sio.connected:
-                establish_server_conecction()
-
-            detect_wake_word()
-            record_and_stream()
-
-            # Espera hasta recibir la respuesta antes de continuar
-            waitStart = time.time()
-            while isBusy:
-                cooldown_tick()
-
-                if not sio.connected:
-                    print("Desconectado del servidor, intentando reconectar...")
-                    establish_server_conecction()
-                    isBusy = False
-                    break
-                if time.time() - waitStart > RESPONSE_TIMEOUT_SECONDS:
-                    print("Tiempo de espera de respuesta excedido.")
-                    isBusy = False
-                    break
-
-                time.sleep(0.1)
-
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("Interrumpido por el usuario")
-        sio.disconnect()
     except Exception as e:
         print(f"Error inesperado: {e}")
-        sio.disconnect()
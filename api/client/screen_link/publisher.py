@@ -0,0 +1,37 @@
+import json
+import socket
+
+
+# Debe coincidir con SOCKET_PANTALLA en screen/main.py
+DEFAULT_SOCKET_PATH = "/tmp/kubibot-screen.sock"
+
+
+class FacePublisher:
+    """
+    Publica el estado del asistente a la pantalla (screen/main.py) por un
+    socket Unix de datagramas.
+
+    Cada cambio es un datagrama JSON pequeno que se envia sin bloquear: la
+    pantalla lo recibe apenas se publica, sin sondear. Si la pantalla no
+    esta corriendo, los mensajes se descartan en silencio.
+
+    Mensaje: {"estado": "idle|listening|thinking|speaking", "emocion": "normal|feliz|triste"}
+    """
+
+    def __init__(self, path=DEFAULT_SOCKET_PATH):
+        self.path = path
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def publish(self, state, emotion=None, **extra):
+        message = {'estado': state}
+        if emotion:
+            message['emocion'] = emotion
+        message.update(extra)
+        try:
+            self.socket.sendto(json.dumps(message, separators=(",", ":")).encode("utf-8"), self.path)
+        except OSError:
+            pass  # Pantalla apagada o con la cola llena: el estado siguiente la pone al dia
+
+    def close(self):
+        self.socket.close()
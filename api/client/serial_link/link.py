@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import serial
+
+from serial_link.protocol import (
+    FrameDecoder, encode_frame, decode_distance, SCAN, STATES, DIRECTIONS, PAYLOAD_LENGTHS,
+    MSG_STOP, MSG_RESUME, MSG_ACK, MSG_DISTANCE, MSG_SCAN, MSG_STATE,
+)
+
+
+class ArduinoLink(threading.Thread):
+    """
+    Enlace serial con el Arduino manejado por un hilo lector dedicado.
+
+    El hilo drena y decodifica las tramas binarias que envia el Arduino
+    (ver serial_link/protocol.py): el ACK de un STOP resuelve el future que
+    lo espera, y las distancias y cambios de estado se guardan en buffers
+    circulares de tamano fijo, consultables en tiempo constante.
+    """
+
+    def __init__(self, port, baudrate, telemetry_size=64):
+        super().__init__(daemon=True)
+        self.port = port
+        self.baudrate = baudrate
+
+        self.serial = None
+        self.write_lock = threading.Lock()
+        self.tx_seq = 0
+        self.pending_acks = {}  # seq -> Future
+        self.running = threading.Event()
+        self.decoder = FrameDecoder(self._on_frame)
+        self.bad_frames = 0
+
+        # (timestamp, distancia en cm) y (timestamp, estado)
+        self.distances = deque(maxlen=telemetry_size)
+        self.states = deque(maxlen=telemetry_size)
+
+    def open(self):
+        """
+        Abre el puerto, espera el reinicio del Arduino, lo pone en marcha
+        y arranca el hilo lector. Lanza una excepcion si no puede abrirlo.
+        """
+        self.serial = serial.Serial(self.port, self.baudrate, timeout=0.1, write_timeout=0.5)
+        time.sleep(2)  # Espera a que la conexión serial se establezca
+        self.running.set()
+        self.start()
+        self.resume()
+
+    @property
+    def is_open(self):
+        return self.serial is not None and self.serial.is_open and self.running.is_set()
+
+    def _send(self, msg_type, payload=b''):
+        """
+        Envia una trama y devuelve un Future que se resuelve en True con su ACK.
+        """
+        future = Future()
+        with self.write_lock:
+            seq = self.tx_seq
+            self.tx_seq = (self.tx_seq + 1) & 0xFF
+            self.pending_acks[seq] = future
+            try:
+                self.serial.write(encode_frame(msg_type, seq, payload))
+                self.serial.flush()
+            except Exception as e:
+                self.pending_acks.pop(seq, None)
+                future.set_exception(e)
+        return future
+
+    def request_stop(self):
+        """
+        Envia STOP y devuelve un Future que se resuelve en True cuando llega
+        el ACK. Quien espera decide el timeout.
+        """
+        if not self.is_open:
+            future = Future()
+            future.set_result(False)
+            return future
+        return self._send(MSG_STOP)
+
+    def resume(self):
+        if self.is_open:
+            self._send(MSG_RESUME)
+
+    def latest_distance(self):
+        """
+        Ultima distancia medida en cm (o None si aun no hay lecturas).
+        """
+        return self.distances[-1][1] if self.distances else None
+
+    def latest_state(self):
+        return self.states[-1][1] if self.states else None
+
+    def telemetry(self):
+        """
+        Copia de las ultimas lecturas de distancia y cambios de estado.
+        """
+        return list(self.distances), list(self.states)
+
+    def run(self):
+        try:
+            while self.running.is_set():
+                self.decoder.feed(self.serial.read(self.serial.in_waiting or 1))
+        except Exception as e:
+            print(f"Error en el enlace serial con Arduino: {e}")
+        finally:
+            self.running.clear()
+
+    def _on_frame(self, msg_type, seq, payload):
+        # Una trama con CRC valido pero payload corto se descarta: no debe
+        # tirar el hilo lector (los STOP quedarian sin ACK hasta reiniciar)
+        if len(payload) < PAYLOAD_LENGTHS.get(msg_type, 0):
+            self.bad_frames += 1
+            return
+        try:
+            self._handle_frame(msg_type, payload)
+        except Exception as e:
+            self.bad_frames += 1
+            print(f"Trama del Arduino descartada ({msg_type:#04x}): {e}")
+
+    def _handle_frame(self, msg_type, payload):
+        now = time.time()
+
+        if msg_type == MSG_DISTANCE:
+            self.distances.append((now, decode_distance(payload)))
+
+        elif msg_type == MSG_STATE:
+            state = STATES[payload[0]] if payload[0] < len(STATES) else "unknown"
+            if state == "turning" and payload[1] < len(DIRECTIONS):
+                state = f"turning_{DIRECTIONS[payload[1]]}"
+            self.states.append((now, state))
+
+        elif msg_type == MSG_SCAN:
+            left, right = SCAN.unpack_from(payload)
+            self.states.append((now, f"scan izq={left / 10} der={right / 10}"))
+
+        elif msg_type == MSG_ACK:
+            with self.write_lock:
+                future = self.pending_acks.pop(payload[1], None)
+            if future is not None and not future.done():
+                future.set_result(True)
+
+    def close(self):
+        self.running.clear()
+        if self.serial is not None:
+            self.serial.close()
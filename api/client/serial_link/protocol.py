@@ -0,0 +1,146 @@
+import struct
+
+
+# Trama: SYNC | TIPO | SEQ | LARGO | PAYLOAD (LARGO bytes) | CRC8
+# El CRC8 (polinomio 0x07) cubre TIPO, SEQ, LARGO y PAYLOAD.
+# Debe coincidir con arduino/arduino.ino.
+FRAME_SYNC = 0xA5
+MAX_PAYLOAD = 8
+
+# Tipos de mensaje
+MSG_STOP = 0x01       # Pi -> Arduino
+MSG_RESUME = 0x02     # Pi -> Arduino
+MSG_ACK = 0x03        # Arduino -> Pi, payload: tipo y seq confirmados
+MSG_DISTANCE = 0x10   # Arduino -> Pi, payload: uint16 distancia en decimas de cm
+MSG_SCAN = 0x11       # Arduino -> Pi, payload: uint16 izquierda, uint16 derecha
+MSG_STATE = 0x12      # Arduino -> Pi, payload: uint8 estado, uint8 direccion
+
+# Valor de distancia que indica objeto fuera de rango
+DISTANCE_OUT_OF_RANGE = 0xFFFF
+
+# Estados y direcciones tal como los enumera el sketch
+STATES = ("advancing", "reversing", "turning", "detained")
+DIRECTIONS = ("left", "right")
+
+DISTANCE = struct.Struct('<H')
+SCAN = struct.Struct('<HH')
+
+# Largo minimo del payload de cada mensaje que recibe la Pi
+PAYLOAD_LENGTHS = {
+    MSG_ACK: 2,
+    MSG_DISTANCE: DISTANCE.size,
+    MSG_SCAN: SCAN.size,
+    MSG_STATE: 2,
+}
+
+
+def _crc8_table():
+    table = bytearray(256)
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[value] = crc
+    return bytes(table)
+
+CRC8_TABLE = _crc8_table()
+
+def crc8(data, crc=0):
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+def encode_frame(msg_type, seq, payload=b''):
+    """
+    Arma una trama lista para escribir en el puerto serial.
+    """
+    body = bytes((msg_type, seq & 0xFF, len(payload))) + bytes(payload)
+    return bytes((FRAME_SYNC,)) + body + bytes((crc8(body),))
+
+def decode_distance(payload):
+    """
+    Distancia en cm de un payload MSG_DISTANCE (None si esta fuera de rango).
+    """
+    value, = DISTANCE.unpack_from(payload)
+    return None if value == DISTANCE_OUT_OF_RANGE else value / 10
+
+
+class FrameDecoder:
+    """
+    Decodificador incremental de tramas.
+
+    Reutiliza un unico buffer preasignado: por cada trama valida llama a
+    `on_frame(tipo, seq, payload)` con un memoryview sobre ese buffer, que
+    solo es valido durante la llamada. Las tramas con CRC invalido (o largo
+    imposible) se descartan y la busqueda de SYNC se retoma desde el byte
+    siguiente a su SYNC, para no perder una trama valida que un byte
+    corrupto haya hecho parecer parte de la anterior.
+    """
+
+    WAIT_SYNC, WAIT_TYPE, WAIT_SEQ, WAIT_LEN, WAIT_PAYLOAD, WAIT_CRC = range(6)
+
+    def __init__(self, on_frame):
+        self.on_frame = on_frame
+        self.buffer = bytearray(MAX_PAYLOAD)
+        self.view = memoryview(self.buffer)
+        # Bytes recibidos desde el ultimo SYNC, por si hay que volver a recorrerlos
+        self.candidate = bytearray(MAX_PAYLOAD + 4)
+        self.candidate_length = 0
+        self.state = self.WAIT_SYNC
+        self.msg_type = 0
+        self.seq = 0
+        self.length = 0
+        self.index = 0
+        self.crc = 0
+        self.crc_errors = 0
+
+    def _resync(self):
+        """
+        Descarta la trama en curso y vuelve a recorrer sus bytes (sin su SYNC).
+        """
+        pending = bytes(self.candidate[:self.candidate_length])
+        self.state = self.WAIT_SYNC
+        self.candidate_length = 0
+        self.feed(pending)
+
+    def feed(self, data):
+        for byte in data:
+            state = self.state
+            if state == self.WAIT_SYNC:
+                if byte == FRAME_SYNC:
+                    self.candidate_length = 0
+                    self.state = self.WAIT_TYPE
+                continue
+
+            self.candidate[self.candidate_length] = byte
+            self.candidate_length += 1
+            if state == self.WAIT_TYPE:
+                self.msg_type = byte
+                self.crc = CRC8_TABLE[byte]
+                self.state = self.WAIT_SEQ
+            elif state == self.WAIT_SEQ:
+                self.seq = byte
+                self.crc = CRC8_TABLE[self.crc ^ byte]
+                self.state = self.WAIT_LEN
+            elif state == self.WAIT_LEN:
+                if byte > MAX_PAYLOAD:
+                    self._resync()
+                    continue
+                self.length = byte
+                self.index = 0
+                self.crc = CRC8_TABLE[self.crc ^ byte]
+                self.state = self.WAIT_PAYLOAD if byte else self.WAIT_CRC
+            elif state == self.WAIT_PAYLOAD:
+                self.buffer[self.index] = byte
+                self.index += 1
+                self.crc = CRC8_TABLE[self.crc ^ byte]
+                if self.index >= self.length:
+                    self.state = self.WAIT_CRC
+            else:
+                if byte == self.crc:
+                    self.state = self.WAIT_SYNC
+                    self.candidate_length = 0
+                    self.on_frame(self.msg_type, self.seq, self.view[:self.length])
+                else:
+                    self.crc_errors += 1
+                    self._resync()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los modulos del cliente se importan relativos a api/client, como en raspberry.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
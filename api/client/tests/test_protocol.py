@@ -0,0 +1,84 @@
+from serial_link.protocol import (
+    FrameDecoder, encode_frame, decode_distance, crc8, DISTANCE, SCAN,
+    FRAME_SYNC, MAX_PAYLOAD, MSG_STOP, MSG_RESUME, MSG_DISTANCE, MSG_SCAN,
+    DISTANCE_OUT_OF_RANGE,
+)
+
+
+def decode(data, byte_by_byte=False):
+    frames = []
+    decoder = FrameDecoder(lambda msg_type, seq, payload: frames.append((msg_type, seq, bytes(payload))))
+    if byte_by_byte:
+        for byte in data:
+            decoder.feed(bytes((byte,)))
+    else:
+        decoder.feed(data)
+    return frames, decoder
+
+
+def test_round_trip():
+    data = encode_frame(MSG_STOP, 1) + encode_frame(MSG_SCAN, 2, SCAN.pack(123, 456))
+    for byte_by_byte in (False, True):
+        frames, decoder = decode(data, byte_by_byte)
+        assert frames == [(MSG_STOP, 1, b''), (MSG_SCAN, 2, SCAN.pack(123, 456))]
+        assert decoder.crc_errors == 0
+
+
+def test_frame_layout_and_crc():
+    frame = encode_frame(MSG_RESUME, 0x1FF, b'\x07')
+    assert frame[0] == FRAME_SYNC
+    assert frame[1:4] == bytes((MSG_RESUME, 0xFF, 1))  # seq en un byte
+    assert frame[-1] == crc8(frame[1:-1])
+
+
+def test_corrupted_crc_is_dropped():
+    bad = bytearray(encode_frame(MSG_DISTANCE, 1, DISTANCE.pack(250)))
+    bad[-1] ^= 0xFF
+    frames, decoder = decode(bytes(bad) + encode_frame(MSG_STOP, 2))
+    assert frames == [(MSG_STOP, 2, b'')]
+    assert decoder.crc_errors == 1
+
+
+def test_corrupted_payload_is_dropped():
+    bad = bytearray(encode_frame(MSG_DISTANCE, 1, DISTANCE.pack(250)))
+    bad[4] ^= 0x01
+    frames, decoder = decode(bytes(bad))
+    assert frames == []
+    assert decoder.crc_errors == 1
+
+
+def test_corrupted_length_does_not_swallow_next_frame():
+    bad = bytearray(encode_frame(MSG_DISTANCE, 1, DISTANCE.pack(250)))
+    bad[3] = MAX_PAYLOAD  # El largo corrupto abarca la trama siguiente
+    data = bytes(bad) + encode_frame(MSG_STOP, 2) + encode_frame(MSG_RESUME, 3)
+    for byte_by_byte in (False, True):
+        frames, _ = decode(data, byte_by_byte)
+        assert frames == [(MSG_STOP, 2, b''), (MSG_RESUME, 3, b'')]
+
+
+def test_impossible_length_resyncs():
+    data = bytes((FRAME_SYNC, MSG_STOP, 0, MAX_PAYLOAD + 1)) + encode_frame(MSG_STOP, 4)
+    frames, _ = decode(data)
+    assert frames == [(MSG_STOP, 4, b'')]
+
+
+def test_truncated_frame_followed_by_valid_frames():
+    truncated = encode_frame(MSG_SCAN, 1, SCAN.pack(1, 2))[:5]
+    data = truncated + encode_frame(MSG_STOP, 2) + encode_frame(MSG_RESUME, 3) + encode_frame(MSG_RESUME, 4)
+    frames, _ = decode(data)
+    # La trama truncada puede arrastrar a la siguiente, pero el decodificador se recupera
+    assert frames[-2:] == [(MSG_RESUME, 3, b''), (MSG_RESUME, 4, b'')]
+    assert all(msg_type != MSG_SCAN for msg_type, _, _ in frames)
+
+
+def test_garbage_between_frames():
+    data = (b'\x00\xff' + encode_frame(MSG_STOP, 1) + b'hola\xa5'
+            + encode_frame(MSG_DISTANCE, 2, DISTANCE.pack(100)) + b'\x13\x37')
+    frames, _ = decode(data)
+    assert (MSG_STOP, 1, b'') in frames
+    assert (MSG_DISTANCE, 2, DISTANCE.pack(100)) in frames
+
+
+def test_decode_distance():
+    assert decode_distance(DISTANCE.pack(125)) == 12.5
+    assert decode_distance(DISTANCE.pack(DISTANCE_OUT_OF_RANGE)) is None
@@ -0,0 +1,29 @@
+import time
+import uuid
+
+
+class TurnTrace:
+    """
+    Traza de un turno en el cliente: guarda cuando ocurrio cada hito
+    (wake word, primer chunk enviado, fin del audio, respuesta recibida,
+    inicio de la reproduccion) relativo a la deteccion de la wake word.
+
+    El id se envia al servidor con `end_of_audio` y vuelve en sus
+    respuestas, para unir las etapas de ambos lados.
+    """
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.start = time.monotonic()
+        self.marks = {}
+
+    def mark(self, name):
+        """
+        Registra un hito (solo la primera vez que ocurre).
+        """
+        if name not in self.marks:
+            self.marks[name] = time.monotonic() - self.start
+
+    def summary(self):
+        marks = " ".join(f"{name}={seconds:.3f}s" for name, seconds in self.marks.items())
+        return f"[traza {self.trace_id}] {marks}"
@@ -0,0 +1,156 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+# Limites de los histogramas (segundos y bytes)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (16000, 32000, 64000, 128000, 256000, 512000, 1024000)
+
+registry = []
+
+
+class Histogram:
+    """
+    Histograma acumulativo con una etiqueta opcional, al estilo Prometheus.
+    """
+
+    def __init__(self, name, description, buckets, label=None):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.series = {}  # valor de la etiqueta -> [conteos por bucket, suma, total]
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, label_value=""):
+        with self.lock:
+            counts, total = self.series.setdefault(label_value, ([0] * len(self.buckets), [0.0, 0]))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            total[0] += value
+            total[1] += 1
+
+    def _labels(self, label_value, extra=""):
+        labels = []
+        if self.label:
+            labels.append(f'{self.label}="{label_value}"')
+        if extra:
+            labels.append(extra)
+        return "{" + ",".join(labels) + "}" if labels else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_value, (counts, (total_sum, total_count)) in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, counts):
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{self._labels(label_value, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{self._labels(label_value, le)} {total_count}")
+                lines.append(f"{self.name}_sum{self._labels(label_value)} {total_sum}")
+                lines.append(f"{self.name}_count{self._labels(label_value)} {total_count}")
+        return lines
+
+
+class Counter:
+    """
+    Contador con una etiqueta opcional, al estilo Prometheus.
+    """
+
+    def __init__(self, name, description, label=None):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, label_value="", amount=1):
+        with self.lock:
+            self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_value, value in sorted(self.values.items()):
+                labels = f'{{{self.label}="{label_value}"}}' if self.label else ""
+                lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+def render_metrics():
+    """
+    Todas las metricas en el formato de texto que lee Prometheus.
+    """
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("kubibot_stage_seconds", "Duracion de cada etapa del turno", LATENCY_BUCKETS, "stage")
+AUDIO_BYTES = Histogram("kubibot_audio_bytes", "Tamano del audio recibido por turno", SIZE_BUCKETS)
+TURNS = Counter("kubibot_turns_total", "Turnos procesados segun resultado", "result")
+SPECULATIONS = Counter("kubibot_speculations_total", "Turnos especulativos segun decision", "decision")
+
+
+class Trace:
+    """
+    Traza de un turno. Cada etapa medida se registra en el histograma de
+    etapas y se guarda en la traza para imprimirla junta al terminar.
+    El id llega del cliente (o se genera) y viaja en los eventos del turno.
+    """
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.start = time.perf_counter()
+        self.spans = []
+
+    def observe(self, stage, seconds):
+        STAGE_SECONDS.observe(seconds, stage)
+        self.spans.append((stage, seconds))
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed_iter(self, iterable, first_stage, total_stage):
+        """
+        Recorre `iterable` midiendo solo el tiempo de espera de cada elemento:
+        hasta el primero (`first_stage`) y el acumulado (`total_stage`).
+        """
+        waited = 0.0
+        first = True
+        iterator = iter(iterable)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    waited += time.perf_counter() - start
+                    break
+                waited += time.perf_counter() - start
+                if first:
+                    self.observe(first_stage, waited)
+                    first = False
+                yield item
+        finally:
+            self.observe(total_stage, waited)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def finish(self, result):
+        TURNS.inc(result)
+        self.observe("total", self.elapsed())
+        spans = " ".join(f"{stage}={seconds:.3f}s" for stage, seconds in self.spans)
+        print(f"[traza {self.trace_id}] {result} {spans}")
@@ -0,0 +1,150 @@
+from collections import deque
+
+import eventlet
+from eventlet import tpool
+from eventlet.event import Event
+from eventlet.semaphore import Semaphore
+
+
+class StagePool:
+    """
+    Pool acotado para una etapa del pipeline (STT, LLM o TTS).
+
+    Limita cuantos trabajos de la etapa corren a la vez y, si el motor es
+    bloqueante, los ejecuta en hilos de tpool, de modo que el hub de eventlet
+    siga atendiendo al resto de los clientes mientras tanto.
+    """
+
+    def __init__(self, name, workers, blocking=True):
+        self.name = name
+        self.workers = max(1, workers)
+        self.blocking = blocking
+        self.slots = Semaphore(self.workers)
+
+    def _execute(self, fn, *args):
+        if self.blocking:
+            return tpool.execute(fn, *args)
+        return fn(*args)
+
+    def run(self, fn, *args):
+        """
+        Ejecuta fn(*args) en la etapa, esperando un cupo si estan todos ocupados.
+        """
+        with self.slots:
+            return self._execute(fn, *args)
+
+    def try_run(self, fn, *args):
+        """
+        Igual que run, pero si no hay cupo libre no ejecuta nada y devuelve
+        (False, None). Sirve para trabajo opcional que no debe retrasar al resto.
+        """
+        if not self.slots.acquire(blocking=False):
+            return False, None
+        try:
+            return True, self._execute(fn, *args)
+        finally:
+            self.slots.release()
+
+    def stream(self, generator):
+        """
+        Recorre un generador bloqueante (por ejemplo, tokens del LLM) desde
+        un hilo, ocupando un cupo de la etapa hasta que termina.
+        """
+        with self.slots:
+            finished = False
+            try:
+                for item in (tpool.Proxy(generator) if self.blocking else generator):
+                    yield item
+                finished = True
+            finally:
+                # Si se corta antes de terminar (por ejemplo, una especulacion
+                # cancelada) se cierra el generador, para que el motor deje de generar
+                if not finished:
+                    self._execute(generator.close)
+
+
+class Scheduler:
+    """
+    Planificador de turnos del servidor.
+
+    Los turnos de una misma sesion se procesan en orden, uno a la vez. Entre
+    sesiones, a lo sumo `max_in_flight` turnos se procesan simultaneamente;
+    el resto espera en una cola FIFO y se le informa su posicion mediante
+    `notify(session_id, posicion)` cada vez que cambia.
+    """
+
+    def __init__(self, max_in_flight, notify):
+        self.max_in_flight = max(1, max_in_flight)
+        self.notify = notify
+        self.in_flight = 0
+        self.waiting = deque()      # (session_id, Event)
+        self.session_queues = {}    # session_id -> Semaphore(1)
+
+    def submit(self, session_id, fn, *args, admitted=False):
+        """
+        Encola un turno de la sesion y retorna de inmediato. Con admitted=True
+        el turno ya tiene un cupo (tomado con `try_admit`) y no vuelve a pedirlo.
+        """
+        queue = self.session_queues.setdefault(session_id, Semaphore(1))
+        eventlet.spawn_n(self._run, queue, session_id, fn, args, admitted)
+
+    def has_capacity(self, session_id):
+        """
+        Indica si un turno de la sesion se admitiria ya mismo: hay cupo, nadie
+        espera en la cola y la sesion no tiene turnos pendientes. Sirve para
+        decidir si vale la pena adelantar trabajo especulativo.
+        """
+        queue = self.session_queues.get(session_id)
+        return (self.in_flight < self.max_in_flight and not self.waiting
+                and not (queue and queue.locked()))
+
+    def try_admit(self, session_id):
+        """
+        Toma un cupo sin esperar si `has_capacity`. Lo usa el trabajo
+        especulativo, que cuenta para `max_in_flight` como un turno mas;
+        el cupo se devuelve con `release` o pasa al turno con submit(admitted=True).
+        """
+        if not self.has_capacity(session_id):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self._release()
+
+    def drop_session(self, session_id):
+        self.session_queues.pop(session_id, None)
+
+    def _run(self, queue, session_id, fn, args, admitted):
+        with queue:
+            if not admitted:
+                self._admit(session_id)
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error procesando turno de {session_id}: {e}")
+            finally:
+                self._release()
+
+    def _admit(self, session_id):
+        if self.in_flight < self.max_in_flight and not self.waiting:
+            self.in_flight += 1
+            return
+
+        admitted = Event()
+        self.waiting.append((session_id, admitted))
+        self._notify_positions()
+        admitted.wait()
+
+    def _release(self):
+        if self.waiting:
+            # El cupo pasa directo al siguiente en la cola
+            _, admitted = self.waiting.popleft()
+            admitted.send()
+            self._notify_positions()
+        else:
+            self.in_flight -= 1
+
+    def _notify_positions(self):
+        for position, (session_id, _) in enumerate(self.waiting, start=1):
+            self.notify(session_id, position)
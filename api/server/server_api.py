@@ -1,11 +1,20 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_socketio import SocketIO, emit, disconnect
 from dotenv import load_dotenv
+from eventlet import tpool
+import eventlet
 import os
+import time
 import wave
-from services.whisper_service import transcribe_audio_file
-from services.ollama_service import ollama_generate_answer, reset_record
-from services.piper_service import generate_tts_response
+from services.backends import create_stt_backend, create_llm_backend, create_tts_backend
+from services.audio_codec import AudioPacketDecoder
+from services.emotion_service import detect_emotion, EMOTION_TAGS, EMOTION_SAD
+from services.lipsync_service import wav_envelope, LIPSYNC
+from services.endpoint_service import EndpointDetector, ENDPOINTING, ENDPOINT_GAP_MS
+from services.preprocess_service import preprocess_audio, NoSpeechError, PREPROCESS
+from scheduler import Scheduler, StagePool
+from speculation import Speculation
+from metrics import Trace, AUDIO_BYTES, STAGE_SECONDS, SPECULATIONS, render_metrics
 
 
 app = Flask(__name__)
@@ -15,8 +24,69 @@ API_TOKEN = os.getenv("API_TOKEN")
 
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
+# Motores de cada etapa, elegidos con STT_BACKEND, LLM_BACKEND y TTS_BACKEND
+stt = create_stt_backend()
+llm = create_llm_backend()
+tts = create_tts_backend()
+
+# Cupos por etapa del pipeline y turnos que se procesan a la vez entre todos los robots
+STT_WORKERS = int(os.getenv("STT_WORKERS", "1"))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "2"))
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "4"))
+
+# Si el motor STT agrupa transcripciones, la etapa debe dejar pasar un lote completo
+STT_SLOTS = max(STT_WORKERS, stt.batch_size)
+
+# Los hilos de tpool deben alcanzar para todas las etapas ocupadas a la vez
+tpool.set_num_threads(max(20, STT_SLOTS + LLM_WORKERS + TTS_WORKERS + 1))
+
+sttPool = StagePool("stt", STT_SLOTS, stt.blocking)
+llmPool = StagePool("llm", LLM_WORKERS, llm.blocking)
+ttsPool = StagePool("tts", TTS_WORKERS, tts.blocking)
+
+def notify_queue_position(sesionId, position):
+    socketio.emit('busy', {'posicion': position}, to=sesionId)
+
+scheduler = Scheduler(MAX_IN_FLIGHT, notify_queue_position)
+
+# Frases fijas que se sintetizan al arrancar y quedan en la cache de audio
+NOT_UNDERSTOOD_PHRASE = "Perdón, no te entendí. ¿Puedes repetirlo?"
+NOT_HEARD_PHRASE = "No te escuché."
+FAILURE_PHRASE = "Perdón, tuve un problema. Intenta de nuevo."
+GREETING_PHRASES = ["Hola, soy Kubibot. ¿En qué te puedo ayudar?"]
+FIXED_PHRASES = [NOT_UNDERSTOOD_PHRASE, NOT_HEARD_PHRASE, FAILURE_PHRASE] + GREETING_PHRASES
+
+# Enunciado de prueba que recorre el pipeline completo durante el arranque
+WARMUP_AUDIO = os.getenv("WARMUP_AUDIO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "audio.wav"))
+WARMUP_SESSION = "__warmup__"
+
+# Estado del arranque de cada etapa: None (en curso), "ok" o el error
+readiness = {'stt': None, 'llm': None, 'tts': None}
+serverReady = False
+
 # Diccionario para almacenar buffers de audio por cliente
 clientBuffers = {}
+# Transcripcion incremental por cliente (si el motor STT la soporta)
+clientTranscriptions = {}
+# Decodificadores de los paquetes de audio (agrupados/comprimidos) por cliente
+clientDecoders = {}
+# Deteccion del fin del enunciado, turno especulativo en curso y temporizador
+# de paquetes por cliente
+clientEndpoints = {}
+clientSpeculations = {}
+clientEndpointTimers = {}
+
+@app.route('/health')
+def health():
+    # 503 mientras se precargan los modelos; los clientes esperan a que responda 200
+    status = 200 if serverReady else 503
+    return jsonify({'listo': serverReady, 'etapas': readiness}), status
+
+@app.route('/metrics')
+def metrics():
+    # Histogramas de latencia por etapa en formato de texto de Prometheus
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
 def validate_token(token):
     return token == API_TOKEN
@@ -27,9 +97,15 @@ def handle_connect():
     if not isValidToken:
         print("Conexión rechazada: Token inválido")
         disconnect()
+    elif not serverReady:
+        print("Conexión rechazada: el servidor aún se está preparando")
+        disconnect()
     else:
         sesionId = request.sid
         clientBuffers[sesionId] = bytearray()
+        clientTranscriptions[sesionId] = stt.new_session()
+        clientDecoders[sesionId] = AudioPacketDecoder()
+        clientEndpoints[sesionId] = EndpointDetector()
         print("Cliente conectado")
 
 @socketio.on('disconnect')
@@ -38,62 +114,331 @@ def handle_disconnect():
     print(f"Cliente {sesionId} desconectado")
     if sesionId in clientBuffers:
         del clientBuffers[sesionId]
+    clientTranscriptions.pop(sesionId, None)
+    clientDecoders.pop(sesionId, None)
+    clientEndpoints.pop(sesionId, None)
+    cancel_speculation(sesionId)
+    scheduler.drop_session(sesionId)
+    llm.drop(sesionId)
 
 @socketio.on('audio_chunk')
 def handle_audio_chunk(data):
     sesionId = request.sid
     if sesionId in clientBuffers:
-        clientBuffers[sesionId].extend(data)
+        decoder = clientDecoders[sesionId]
+        try:
+            pcm = decoder.decode(data)
+        except Exception as e:
+            print(f"Error decodificando paquete de audio: {e}")
+            return
+        if decoder.turn_restarted:
+            # La grabacion anterior se abandono: su audio no debe mezclarse con esta
+            clientBuffers[sesionId] = bytearray()
+            clientTranscriptions[sesionId] = stt.new_session()
+            clientEndpoints[sesionId].reset()
+            cancel_speculation(sesionId)
+        clientBuffers[sesionId].extend(pcm)
+
+        if ENDPOINTING:
+            detect_endpoint(sesionId, pcm)
+
+        # Se decodifica en segundo plano a medida que llega audio nuevo
+        transcription = clientTranscriptions.get(sesionId)
+        if transcription and transcription.should_decode(len(clientBuffers[sesionId]) // 2):
+            transcription.busy = True
+            socketio.start_background_task(run_partial_transcription, sesionId, transcription, bytes(clientBuffers[sesionId]))
+
+def detect_endpoint(sesionId, pcm):
+    """
+    Predice el fin del enunciado con el audio recien llegado: por silencio
+    al final del buffer o, si el cliente deja de enviar paquetes, por tiempo.
+    Si llega mas voz, el turno especulativo en curso se descarta.
+    """
+    endpoint = clientEndpoints[sesionId]
+    if endpoint.feed(pcm):
+        cancel_speculation(sesionId)
+    elif endpoint.ended():
+        start_speculation(sesionId)
+
+    timer = clientEndpointTimers.pop(sesionId, None)
+    if timer:
+        timer.cancel()
+    if endpoint.speech_seen:
+        clientEndpointTimers[sesionId] = eventlet.spawn_after(ENDPOINT_GAP_MS / 1000, start_speculation, sesionId)
+
+def start_speculation(sesionId):
+    """
+    Adelanta STT y LLM sobre el audio recibido hasta ahora, si hay cupo.
+    """
+    clientEndpointTimers.pop(sesionId, None)
+    if sesionId in clientSpeculations or not clientBuffers.get(sesionId):
+        return
+    if not scheduler.try_admit(sesionId):
+        # Con el servidor ocupado, el trabajo especulativo le quitaria cupo a turnos confirmados
+        SPECULATIONS.inc("sin_cupo")
+        return
+
+    # La sesion de streaming no se modifica hasta que el turno se confirme
+    transcription = clientTranscriptions.get(sesionId)
+    transcribe = lambda pcm: transcribe_turn(pcm, transcription, commit=False)
+    answer = lambda text: llmPool.stream(llm.stream_answer(sesionId, text, record=False))
+
+    speculation = Speculation(bytes(clientBuffers[sesionId]), scheduler.release)
+    clientSpeculations[sesionId] = speculation
+    SPECULATIONS.inc("iniciada")
+    socketio.start_background_task(speculation.run, transcribe, answer)
+
+def cancel_speculation(sesionId):
+    timer = clientEndpointTimers.pop(sesionId, None)
+    if timer:
+        timer.cancel()
+    speculation = clientSpeculations.pop(sesionId, None)
+    if speculation:
+        speculation.cancel()
+        SPECULATIONS.inc("cancelada")
+
+def run_partial_transcription(sesionId, transcription, pcm):
+    """
+    Decodifica la ventana pendiente de una sesion y envia la hipotesis parcial.
+    """
+    try:
+        # Las parciales solo usan un cupo de STT libre: nunca demoran una transcripcion final
+        start = time.perf_counter()
+        ran, partialText = sttPool.try_run(transcription.decode, pcm)
+        if not ran:
+            return
+        STAGE_SECONDS.observe(time.perf_counter() - start, "stt_partial")
+        # Si la sesion ya termino su turno, la hipotesis quedo obsoleta
+        if partialText and clientTranscriptions.get(sesionId) is transcription:
+            socketio.emit('partial_transcript', {'texto': partialText}, to=sesionId)
+    except Exception as e:
+        print(f"Error en transcripción parcial: {e}")
+    finally:
+        transcription.busy = False
 
 
 @socketio.on('end_of_audio')
-def handle_end_of_audio():
+def handle_end_of_audio(data=None):
 
     sesionId = request.sid
     uniqueBuffer = clientBuffers.get(sesionId)
+    # El cliente puede numerar sus turnos; se devuelve en cada respuesta
+    # para que descarte las que lleguen de un turno ya abandonado
+    turn = data.get('turn') if isinstance(data, dict) else None
+    # La traza del turno usa el id que manda el cliente, para unir sus etapas con las del servidor
+    trace = Trace(data.get('trace') if isinstance(data, dict) else None)
     print("Audio recibido, procesando...")
 
     if not uniqueBuffer:
-        emit('response', {'error': 'No se recibió ningún audio'})
+        emit('response', {'error': 'No se recibió ningún audio', 'turn': turn, 'trace': trace.trace_id})
+        trace.finish("sin_audio")
         return
     print(f"Tamaño del buffer de audio: {len(uniqueBuffer)} bytes")
+    AUDIO_BYTES.observe(len(uniqueBuffer))
+
+    # El turno se lleva su audio y su transcripcion; la sesion queda lista
+    # para grabar el siguiente mientras este espera en el planificador
+    with trace.span("assemble"):
+        pcm = bytes(uniqueBuffer)
+    transcription = clientTranscriptions.get(sesionId)
+    clientBuffers[sesionId] = bytearray()
+    clientTranscriptions[sesionId] = stt.new_session()
+    clientDecoders[sesionId].reset()
+    clientEndpoints[sesionId].reset()
 
-    tempFileName = f"temp_audio_{sesionId}.wav"
+    # Si despues de la prediccion no llego mas voz, el turno especulativo se confirma
+    timer = clientEndpointTimers.pop(sesionId, None)
+    if timer:
+        timer.cancel()
+    speculation = clientSpeculations.pop(sesionId, None)
+    if speculation:
+        SPECULATIONS.inc("confirmada")
+        trace.observe("speculation_lead", time.perf_counter() - speculation.started)
+
+    # El turno confirmado hereda el cupo que ya ocupaba la especulacion
+    admitted = speculation.take_slot() if speculation else False
+    scheduler.submit(sesionId, process_turn, sesionId, pcm, transcription, turn, trace, speculation, admitted=admitted)
+
+def transcribe_turn(pcm, transcription, commit=True):
+    """
+    Preprocesa el audio del turno (recorte de silencio, ganancia y descarte
+    del ruido) y lo transcribe. Lanza NoSpeechError sin ocupar el STT si
+    el audio no tiene voz.
+    """
+    if PREPROCESS:
+        start = time.perf_counter()
+        # Con transcripcion incremental se conserva el comienzo del buffer
+        pcm = tpool.execute(preprocess_audio, pcm, transcription is None)
+        STAGE_SECONDS.observe(time.perf_counter() - start, "preprocess")
+
+    if transcription:
+        # Solo queda por decodificar la cola que no se confirmo durante el streaming
+        return sttPool.run(transcription.finish, pcm, commit)
+    return sttPool.run(stt.transcribe, pcm)
+
+def process_turn(sesionId, pcm, transcription, turn, trace, speculation=None):
+    """
+    Procesa un turno completo (STT, LLM y TTS) cuando el planificador lo admite.
+    Cada etapa bloqueante corre en su pool, fuera del hub de eventlet.
+    Con un turno especulativo confirmado, STT y LLM ya estan en curso (o
+    terminados) y solo se esperan sus resultados.
+    """
+    trace.observe("queue", trace.elapsed())
+
+    def send(event, payload):
+        payload['turn'] = turn
+        payload['trace'] = trace.trace_id
+        with trace.span("emit"):
+            socketio.emit(event, payload, to=sesionId)
+
+    # Etapa en curso, para informar donde fallo el turno
+    stage = "transcripción"
+    sequence = 0
     try:
-        with wave.open(tempFileName, 'wb') as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(2)
-            wf.setframerate(16000)
-            wf.writeframes(uniqueBuffer)
+        with trace.span("stt"):
+            if speculation:
+                trasncribedText = speculation.transcript()
+            else:
+                trasncribedText = transcribe_turn(pcm, transcription)
+
+        # Cada oracion se sintetiza y envia apenas Ollama la termina,
+        # asi el cliente empieza a reproducir antes de tener la respuesta completa
+        responseParts = []
+        if speculation:
+            answer = speculation.answer()
+        else:
+            answer = llmPool.stream(llm.stream_answer(sesionId, trasncribedText))
+        stage = "generación de la respuesta"
+        for sentence in trace.timed_iter(answer, "llm_first", "llm"):
+            responseParts.append(sentence)
+            stage = "síntesis de voz"
+            with trace.span("tts"):
+                audioData = ttsPool.run(tts.synthesize, sentence)
+            stage = "generación de la respuesta"
 
-        trasncribedText = transcribe_audio_file(tempFileName)
-        responseText = ollama_generate_answer(trasncribedText)
-        emit('response', {'respuesta': responseText})
-        audioData = generate_tts_response(responseText)
+            if audioData:
+                chunk = {'seq': sequence, 'audio': audioData, 'final': False}
+                if LIPSYNC:
+                    # Nivel de la voz cada 20 ms: la pantalla solo lo indexa al reproducir
+                    chunk['envolvente'] = wav_envelope(audioData)
+                if sequence == 0 and EMOTION_TAGS:
+                    # La cara reacciona apenas empieza a sonar la primera oracion
+                    chunk['emocion'] = detect_emotion(sentence)
+                send('audio_response_chunk', chunk)
+                if sequence == 0:
+                    trace.observe("first_audio", trace.elapsed())
+                sequence += 1
+                socketio.sleep(0)  # Cede el loop para que el chunk salga de inmediato
+            else:
+                print(f"No se pudo generar TTS para: {sentence}")
 
-        if audioData:
-            emit('audio_response', audioData)
-            print("Respuesta TTS enviada al cliente.")
+        answer = " ".join(responseParts)
+        if speculation:
+            # La respuesta especulativa entra al historial recien ahora que se confirmo
+            llm.record(sesionId, trasncribedText, responseParts)
+        send('response', {'respuesta': answer, **({'emocion': detect_emotion(answer)} if EMOTION_TAGS else {})})
+        # Chunk final vacio para indicar al cliente que no vienen mas
+        send('audio_response_chunk', {'seq': sequence, 'audio': b'', 'final': True})
+        print(f"Respuesta TTS enviada al cliente en {sequence} chunks.")
+        trace.finish("ok")
+
+    except Exception as e:
+        # Se avisa con una frase ya sintetizada antes de informar el error
+        if isinstance(e, NoSpeechError):
+            phrase = NOT_HEARD_PHRASE
+        elif isinstance(e, ValueError) and stage == "transcripción":
+            phrase = NOT_UNDERSTOOD_PHRASE
         else:
-            print("No se pudo generar la respuesta TTS.")
+            phrase = FAILURE_PHRASE
+        try:
+            audioData = ttsPool.run(tts.synthesize, phrase)
+        except Exception as ttsError:
+            print(f"No se pudo sintetizar la frase de error: {ttsError}")
+            audioData = None
+        if audioData:
+            # Si ya salieron oraciones del turno, la frase sigue el mismo stream
+            chunk = {'seq': sequence, 'audio': audioData, 'final': False}
+            if LIPSYNC:
+                chunk['envolvente'] = wav_envelope(audioData)
+            if EMOTION_TAGS and sequence == 0:
+                chunk['emocion'] = EMOTION_SAD
+            send('audio_response_chunk', chunk)
+            sequence += 1
+        send('audio_response_chunk', {'seq': sequence, 'audio': b'', 'final': True})
+        send('response', {'error': f"Error en {stage}: {str(e)}"})
+        trace.finish("sin_voz" if isinstance(e, NoSpeechError) else "error")
+
+@socketio.on('response_cache')
+def handle_response_cache(data):
+    # Una sesion puede pedir respuestas siempre generadas (su historial influye en ellas)
+    sesionId = request.sid
+    enabled = bool(data.get('habilitado', True)) if isinstance(data, dict) else True
+    llm.set_cache(sesionId, enabled)
+    print(f"Cache de respuestas {'habilitada' if enabled else 'deshabilitada'} para {sesionId}")
 
+@socketio.on('reset_record')
+def handle_reset_record():
+    sesionId = request.sid
+    llm.reset(sesionId)
+    print(f"Historial de conversación de {sesionId} reseteado")
 
+def load_warmup_audio():
+    """
+    PCM int16 a 16 kHz del enunciado de prueba, o un segundo de silencio si no esta.
+    """
+    try:
+        with wave.open(WARMUP_AUDIO, 'rb') as wf:
+            return wf.readframes(wf.getnframes())
+    except (OSError, wave.Error):
+        return bytes(2 * 16000)
+
+def warm_up_pipeline():
+    """
+    Precarga los modelos de las tres etapas y pasa un enunciado de prueba
+    por todo el pipeline. Hasta que termina, el servidor rechaza conexiones
+    y /health responde 503. Una etapa que falla queda informada en /health,
+    pero no impide atender (sus turnos fallaran como antes).
+    """
+    global serverReady
+    start = time.perf_counter()
+    text = "Hola"
+
+    try:
+        sttPool.run(stt.warm_up)
+        try:
+            # Tambien carga el VAD del preprocesamiento
+            text = transcribe_turn(load_warmup_audio(), None)
+        except ValueError:
+            pass  # Silencio o audio ininteligible: el motor igual quedo listo
+        readiness['stt'] = "ok"
     except Exception as e:
-        emit('response', {'error': f"Error en transcripción: {str(e)}"})
+        readiness['stt'] = str(e)
 
+    sentences = []
+    try:
+        llmPool.run(llm.warm_up)
+        # Sin cache, para que la respuesta de prueba si pase por el modelo
+        llm.set_cache(WARMUP_SESSION, False)
+        sentences = llmPool.run(lambda: list(llm.stream_answer(WARMUP_SESSION, text)))
+        readiness['llm'] = "ok"
+    except Exception as e:
+        readiness['llm'] = str(e)
     finally:
-        # Se limpia el buffer del cliente y se elimina el archivo temporal
-        if sesionId in clientBuffers:
-            clientBuffers[sesionId] = bytearray()
+        llm.drop(WARMUP_SESSION)
 
-        if os.path.exists(tempFileName):
-            os.remove(tempFileName)
+    try:
+        ttsPool.run(tts.warm_up)
+        ttsPool.run(tts.preload, FIXED_PHRASES)
+        ttsPool.run(tts.synthesize, sentences[0] if sentences else GREETING_PHRASES[0])
+        readiness['tts'] = "ok"
+    except Exception as e:
+        readiness['tts'] = str(e)
 
-@socketio.on('reset_record')
-def handle_reset_record():
-    reset_record()
-    print("Historial de conversación reseteado")
+    serverReady = True
+    print(f"Pipeline listo en {time.perf_counter() - start:.1f} s: {readiness}")
 
 if __name__ == '__main__':
+    # El servidor escucha de inmediato (para /health) y se precarga en segundo plano
+    socketio.start_background_task(warm_up_pipeline)
     socketio.run(app, host="0.0.0.0", port=5000)
 
@@ -0,0 +1,100 @@
+import zlib
+
+import numpy as np
+
+
+# Codecs que puede usar el cliente para enviar audio (ver api/client/audio/uplink.py)
+CODEC_PCM = "pcm"
+CODEC_ZLIB = "zlib"
+CODEC_OPUS = "opus"
+
+SAMPLE_RATE = 16000
+
+
+def resample_pcm(pcm, rate):
+    """
+    Lleva PCM int16 de `rate` Hz a SAMPLE_RATE, que es lo que esperan el STT
+    y el resto del servidor. Con una razon entera se promedia cada grupo de
+    muestras (filtra antes de diezmar); si no, se interpola linealmente.
+    """
+    if rate == SAMPLE_RATE or not pcm:
+        return pcm
+    samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+    if rate % SAMPLE_RATE == 0:
+        factor = rate // SAMPLE_RATE
+        usable = len(samples) - len(samples) % factor
+        resampled = samples[:usable].reshape(-1, factor).mean(axis=1)
+    else:
+        length = int(round(len(samples) * SAMPLE_RATE / rate))
+        resampled = np.interp(np.linspace(0, len(samples) - 1, length), np.arange(len(samples)), samples)
+    return np.clip(resampled, -32768, 32767).astype(np.int16).tobytes()
+
+
+class AudioPacketDecoder:
+    """
+    Decodifica los paquetes de audio de una sesion a PCM int16.
+
+    Acepta tanto el formato antiguo (bytes PCM crudos por frame) como los
+    paquetes agrupados {'seq', 'codec', 'rate', 'samples', 'data'}.
+    Si se pierde un paquete se rellena con silencio para no desfasar el audio.
+    El audio capturado a otra frecuencia se remuestrea a SAMPLE_RATE.
+
+    Cada grabacion numera sus paquetes desde 0: un paquete con seq 0 a mitad
+    de un turno indica que el cliente abandono la grabacion anterior sin
+    enviar `end_of_audio`, y deja `turn_restarted` en True para que la
+    sesion descarte el audio viejo.
+    """
+
+    def __init__(self):
+        self.expected_seq = 0
+        self.opus_decoder = None
+        self.turn_restarted = False
+
+    def reset(self):
+        self.expected_seq = 0
+        self.turn_restarted = False
+
+    def decode(self, packet):
+        """
+        Devuelve el PCM int16 contenido en el paquete.
+        """
+        if isinstance(packet, (bytes, bytearray)):
+            return bytes(packet)
+
+        pcm = bytearray()
+        seq = packet.get('seq', self.expected_seq)
+        self.turn_restarted = seq == 0 and self.expected_seq > 0
+        if self.turn_restarted:
+            print("El cliente empezó una grabación nueva sin terminar la anterior")
+            self.expected_seq = 0
+        if seq > self.expected_seq:
+            missing = seq - self.expected_seq
+            print(f"Se perdieron {missing} paquetes de audio, se rellenan con silencio")
+            pcm.extend(bytes(packet.get('samples', 0) * 2 * missing))
+        elif seq < self.expected_seq:
+            print(f"Paquete de audio {seq} duplicado o fuera de orden, se descarta")
+            return b''
+        self.expected_seq = seq + 1
+
+        codec = packet.get('codec', CODEC_PCM)
+        rate = packet.get('rate', SAMPLE_RATE)
+        data = packet['data']
+        if codec == CODEC_ZLIB:
+            pcm.extend(zlib.decompress(data))
+        elif codec == CODEC_OPUS:
+            pcm.extend(self._decode_opus(data, rate))
+        elif codec == CODEC_PCM:
+            pcm.extend(data)
+        else:
+            raise ValueError(f"Codec de audio desconocido: {codec}")
+
+        return resample_pcm(bytes(pcm), rate)
+
+    def _decode_opus(self, frames, rate):
+        if self.opus_decoder is None:
+            import opuslib
+            self.opus_decoder = opuslib.Decoder(rate, 1)
+
+        # Cada frame Opus es de 20 ms
+        frame_size = rate // 50
+        return b''.join(self.opus_decoder.decode(frame, frame_size) for frame in frames)
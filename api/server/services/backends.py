@@ -0,0 +1,258 @@
+import json
+import os
+
+from services.conversation import ConversationStore, split_sentences, MAX_TURNS, TOKEN_BUDGET
+
+
+# Motor de cada etapa (se elige por despliegue con variables de entorno)
+STT_BACKEND = os.getenv("STT_BACKEND", "faster-whisper")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")
+TTS_BACKEND = os.getenv("TTS_BACKEND", "piper")
+
+sttBackends = {}
+llmBackends = {}
+ttsBackends = {}
+
+
+def register_stt(name):
+    def decorator(cls):
+        sttBackends[name] = cls
+        return cls
+    return decorator
+
+def register_llm(name):
+    def decorator(cls):
+        llmBackends[name] = cls
+        return cls
+    return decorator
+
+def register_tts(name):
+    def decorator(cls):
+        ttsBackends[name] = cls
+        return cls
+    return decorator
+
+
+class Backend:
+    """
+    Interfaz comun de los motores.
+
+    `blocking` indica si sus llamadas bloquean el hilo (y deben correr en
+    tpool) o si cooperan con eventlet y pueden llamarse desde el hub.
+    Las dependencias de cada motor se importan recien al cargarlo, asi un
+    despliegue solo necesita las del motor que usa.
+    """
+
+    name = ""
+    blocking = True
+
+    def load(self):
+        """
+        Carga el modelo en memoria (idempotente).
+        """
+
+    def warm_up(self):
+        """
+        Deja el motor listo para atender el primer pedido sin demoras.
+        """
+        self.load()
+
+
+class STTBackend(Backend):
+    # Transcripcion incremental mientras llega el audio
+    streaming = False
+    # Cuantas transcripciones agrupa en una pasada (1 = sin lotes)
+    batch_size = 1
+
+    def transcribe(self, pcm):
+        """
+        PCM int16 a 16 kHz -> texto. Lanza ValueError si no entiende el audio.
+        """
+        raise NotImplementedError
+
+    def new_session(self):
+        """
+        Estado de transcripcion incremental de una sesion, o None si el
+        motor no la soporta.
+        """
+        return None
+
+
+class LLMBackend(Backend):
+
+    def stream_answer(self, session_id, prompt, record=True):
+        """
+        Generador de la respuesta oracion por oracion. Al terminar guarda el
+        turno en el historial, salvo con record=False (ver `record`).
+        """
+        raise NotImplementedError
+
+    def record(self, session_id, prompt, sentences):
+        """
+        Guarda en el historial (y en la cache, si el motor tiene) un turno
+        generado con record=False, una vez confirmado.
+        """
+
+    def reset(self, session_id):
+        pass
+
+    def drop(self, session_id):
+        pass
+
+    def set_cache(self, session_id, enabled):
+        pass
+
+
+class TTSBackend(Backend):
+
+    def synthesize(self, text):
+        """
+        Texto -> bytes WAV, o None si no se pudo generar.
+        """
+        raise NotImplementedError
+
+    def preload(self, phrases):
+        """
+        Sintetiza de antemano frases fijas, si el motor tiene cache.
+        """
+
+
+@register_stt("faster-whisper")
+class FasterWhisperSTT(STTBackend):
+    """
+    faster-whisper (CTranslate2) en el mismo proceso.
+    """
+
+    def __init__(self):
+        from services import whisper_service
+        self.service = whisper_service
+        self.streaming = whisper_service.STREAMING
+        self.batch_size = whisper_service.BATCH_SIZE if whisper_service.BATCHING else 1
+
+    def load(self):
+        self.service.load_model()
+
+    def warm_up(self):
+        self.service.warm_up_model()
+
+    def transcribe(self, pcm):
+        return self.service.transcribe_audio(pcm)
+
+    def new_session(self):
+        return self.service.StreamingTranscription() if self.streaming else None
+
+
+@register_llm("ollama")
+class OllamaLLM(LLMBackend):
+    """
+    Ollama con historial por sesion y cache de respuestas.
+    """
+
+    def __init__(self):
+        from services import ollama_service
+        self.service = ollama_service
+
+    def load(self):
+        self.service.load_model()
+
+    def stream_answer(self, session_id, prompt, record=True):
+        return self.service.ollama_stream_answer(session_id, prompt, record)
+
+    def record(self, session_id, prompt, sentences):
+        self.service.record_turn(session_id, prompt, sentences)
+
+    def reset(self, session_id):
+        self.service.reset_record(session_id)
+
+    def drop(self, session_id):
+        self.service.drop_record(session_id)
+
+    def set_cache(self, session_id, enabled):
+        self.service.set_answer_cache(session_id, enabled)
+
+
+@register_llm("llama-cpp")
+class LlamaCppLLM(LLMBackend):
+    """
+    Servidor de llama.cpp (API compatible con OpenAI, /v1/chat/completions)
+    en streaming. El historial se maneja igual que con Ollama.
+    """
+
+    def __init__(self):
+        import httpx
+        self.url = os.getenv("LLAMA_CPP_URL", "http://localhost:8080").rstrip("/")
+        self.system_prompt = os.getenv("LLAMA_CPP_SYSTEM_PROMPT", "")
+        self.options = {
+            'max_tokens': int(os.getenv("LLAMA_CPP_MAX_TOKENS", "70")),
+            'temperature': float(os.getenv("LLAMA_CPP_TEMPERATURE", "0.5")),
+        }
+        self.client = httpx.Client(timeout=60.0)
+        self.store = ConversationStore(MAX_TURNS, TOKEN_BUDGET)
+
+    def _fragments(self, messages):
+        with self.client.stream("POST", f"{self.url}/v1/chat/completions",
+                                json={'messages': messages, 'stream': True, **self.options}) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                delta = json.loads(line[6:])['choices'][0].get('delta', {})
+                yield delta.get('content') or ""
+
+    def stream_answer(self, session_id, prompt, record=True):
+        messages = self.store.messages(session_id, prompt)
+        if self.system_prompt:
+            messages.insert(0, {'role': 'system', 'content': self.system_prompt})
+
+        try:
+            yield from self.store.stream_turn(session_id, prompt, split_sentences(self._fragments(messages)), record)
+        except Exception as e:
+            print(f"Error al contactar llama.cpp: {e}")
+            raise Exception(f"Error en el servicio llama.cpp: {str(e)}")
+
+    def record(self, session_id, prompt, sentences):
+        self.store.add_turn(session_id, prompt, " ".join(sentences))
+
+    def reset(self, session_id):
+        self.store.reset(session_id)
+
+    def drop(self, session_id):
+        self.store.drop(session_id)
+
+
+@register_tts("piper")
+class PiperTTS(TTSBackend):
+    """
+    Piper en el mismo proceso, con un pool de voces y cache de audio.
+    """
+
+    def __init__(self):
+        from services import piper_service
+        self.service = piper_service
+
+    def load(self):
+        self.service.get_pool()
+
+    def warm_up(self):
+        self.service.warm_up_pool()
+
+    def synthesize(self, text):
+        return self.service.generate_tts_response(text)
+
+    def preload(self, phrases):
+        self.service.preload_tts_phrases(phrases)
+
+
+def _create(kind, registry, name):
+    if name not in registry:
+        raise ValueError(f"Motor de {kind} desconocido: {name} (disponibles: {', '.join(sorted(registry))})")
+    return registry[name]()
+
+def create_stt_backend(name=None):
+    return _create("STT", sttBackends, name or STT_BACKEND)
+
+def create_llm_backend(name=None):
+    return _create("LLM", llmBackends, name or LLM_BACKEND)
+
+def create_tts_backend(name=None):
+    return _create("TTS", ttsBackends, name or TTS_BACKEND)
@@ -0,0 +1,165 @@
+import os
+import queue
+import re
+import threading
+from collections import deque
+
+
+# Limites del historial por sesion (se puede sobreescribir con variables de entorno)
+MAX_TURNS = int(os.getenv("OLLAMA_MAX_TURNS", "6"))           # pares pregunta/respuesta
+TOKEN_BUDGET = int(os.getenv("OLLAMA_TOKEN_BUDGET", "1024"))  # tokens aproximados
+
+# Fin de oracion: signo de puntuacion seguido de espacio (evita cortar "3.5")
+SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+def estimate_tokens(text):
+    """
+    Estimacion barata de tokens (~4 caracteres por token), suficiente para el presupuesto.
+    """
+    return len(text) // 4 + 1
+
+
+class Conversation:
+    """
+    Historial de una sesion: ventana de mensajes recientes mas un resumen opcional
+    de los turnos que ya salieron de la ventana.
+    """
+
+    def __init__(self):
+        self.messages = deque()
+        self.tokens = 0
+        self.summary = ""
+
+
+class ConversationStore:
+    """
+    Historial de conversacion por sesion, acotado por cantidad de turnos y por
+    presupuesto de tokens para que el costo de cada llamada al LLM no crezca
+    con la duracion de la sesion.
+
+    `summarize(resumen, mensajes)`, si se indica, condensa los turnos que
+    salen de la ventana en un resumen que se antepone al historial.
+    """
+
+    def __init__(self, max_turns, token_budget, summarize=None):
+        self.max_messages = max(2, 2 * max_turns)
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.conversations = {}
+        self.lock = threading.Lock()
+        # Los resumenes se generan en un hilo aparte, en orden, fuera del turno
+        self.pending_summaries = queue.Queue()
+        self.summarizer = None
+
+    def open(self, session_id):
+        """
+        Crea el historial de la sesion si todavia no existe.
+        """
+        with self.lock:
+            return self.conversations.setdefault(session_id, Conversation())
+
+    def messages(self, session_id, prompt):
+        """
+        Devuelve los mensajes a enviar al LLM: resumen, ventana y el nuevo prompt.
+        """
+        conversation = self.open(session_id)
+        with self.lock:
+            messages = list(conversation.messages)
+            summary = conversation.summary
+
+        if summary:
+            messages.insert(0, {'role': 'user', 'content': f"(Resumen de lo conversado antes: {summary})"})
+        messages.append({'role': 'user', 'content': prompt})
+        return messages
+
+    def add_turn(self, session_id, prompt, answer):
+        """
+        Guarda un turno completo y recorta la ventana si se excede algun limite.
+        Se descartan turnos completos (pregunta y respuesta) y nunca el recien
+        guardado, aunque por si solo exceda el presupuesto.
+        Si la sesion ya se elimino (se desconecto mientras se generaba la
+        respuesta), el turno se descarta en vez de volver a crearla.
+        """
+        with self.lock:
+            conversation = self.conversations.get(session_id)
+            if conversation is None:
+                return
+            for message in ({'role': 'user', 'content': prompt},
+                            {'role': 'assistant', 'content': answer}):
+                conversation.messages.append(message)
+                conversation.tokens += estimate_tokens(message['content'])
+
+            dropped = []
+            while len(conversation.messages) > 2 and (
+                    len(conversation.messages) > self.max_messages
+                    or conversation.tokens > self.token_budget):
+                for _ in range(2):
+                    message = conversation.messages.popleft()
+                    conversation.tokens -= estimate_tokens(message['content'])
+                    dropped.append(message)
+
+        if dropped and self.summarize:
+            # El resumen es otra llamada al LLM: no debe demorar el final del turno
+            self.pending_summaries.put((session_id, dropped))
+            with self.lock:
+                if self.summarizer is None:
+                    self.summarizer = threading.Thread(target=self._summarize_pending, daemon=True)
+                    self.summarizer.start()
+
+    def _summarize_pending(self):
+        while True:
+            session_id, dropped = self.pending_summaries.get()
+            with self.lock:
+                conversation = self.conversations.get(session_id)
+                summary = conversation.summary if conversation else None
+            if conversation is None:
+                continue  # La sesion se reseteo o se desconecto
+
+            newSummary = self.summarize(summary, dropped)
+            with self.lock:
+                if self.conversations.get(session_id) is conversation:
+                    conversation.summary = newSummary
+
+    def stream_turn(self, session_id, prompt, sentences, record=True):
+        """
+        Entrega las oraciones de una respuesta y, al terminar, guarda el turno
+        completo en el historial (salvo con record=False).
+        """
+        self.open(session_id)
+        generatedParts = []
+        for sentence in sentences:
+            generatedParts.append(sentence)
+            yield sentence
+        if record:
+            self.add_turn(session_id, prompt, " ".join(generatedParts))
+
+    def reset(self, session_id):
+        with self.lock:
+            self.conversations[session_id] = Conversation()
+
+    def drop(self, session_id):
+        with self.lock:
+            self.conversations.pop(session_id, None)
+
+
+def split_sentences(fragments):
+    """
+    Convierte los fragmentos de texto que genera el LLM en oraciones
+    completas, entregando cada una apenas termina.
+    """
+    pending = ""
+    for fragment in fragments:
+        pending += fragment
+
+        # Se entregan todas las oraciones completas del buffer
+        sentences = SENTENCE_END.split(pending)
+        pending = sentences.pop()
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if sentence:
+                yield sentence
+
+    # Lo que quede al final es la ultima oracion (puede no tener punto)
+    pending = pending.strip()
+    if pending:
+        yield pending
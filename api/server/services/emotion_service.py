@@ -0,0 +1,35 @@
+import os
+
+from services.response_cache import normalize_text
+
+
+# Etiqueta de emocion en las respuestas, para la cara del robot
+EMOTION_TAGS = os.getenv("EMOTION_TAGS", "1") == "1"
+
+EMOTION_NORMAL = "normal"
+EMOTION_HAPPY = "feliz"
+EMOTION_SAD = "triste"
+
+# Expresiones (ya normalizadas) que inclinan la respuesta hacia cada emocion
+HAPPY_WORDS = (
+    "genial", "excelente", "me alegra", "felicidades", "claro que si", "con gusto",
+    "me encanta", "que bueno", "perfecto", "gracias", "feliz", "divertido",
+)
+SAD_WORDS = (
+    "lo siento", "lamento", "lamentablemente", "desafortunadamente", "perdon",
+    "no puedo", "no se", "no tengo", "triste", "no entendi", "problema",
+)
+
+def detect_emotion(text):
+    """
+    Clasificacion barata por palabras clave: corre sobre cada respuesta
+    sin pasar de nuevo por el LLM.
+    """
+    normalized = f" {normalize_text(text)} "
+    happy = sum(normalized.count(f" {word} ") for word in HAPPY_WORDS)
+    sad = sum(normalized.count(f" {word} ") for word in SAD_WORDS)
+    if happy > sad:
+        return EMOTION_HAPPY
+    if sad > happy:
+        return EMOTION_SAD
+    return EMOTION_NORMAL
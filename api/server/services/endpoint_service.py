@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+
+
+# Deteccion del fin del enunciado en el servidor, para adelantar STT y LLM
+# mientras el cliente todavia espera su segundo de silencio
+ENDPOINTING = os.getenv("ENDPOINTING", "1") == "1"
+# Silencio al final del buffer con el que se da por terminado el enunciado
+ENDPOINT_SILENCE_MS = int(os.getenv("ENDPOINT_SILENCE_MS", "250"))
+# Tiempo sin recibir paquetes con el que tambien se da por terminado
+# (el cliente deja de subir audio pasado su hangover)
+ENDPOINT_GAP_MS = int(os.getenv("ENDPOINT_GAP_MS", "350"))
+# RMS minimo (int16) de una ventana para considerarla voz
+ENDPOINT_SPEECH_RMS = float(os.getenv("ENDPOINT_SPEECH_RMS", "600"))
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+class EndpointDetector:
+    """
+    Sigue la energia del audio de una sesion a medida que llega, en
+    ventanas de FRAME_MS, y cuenta cuanto silencio hay despues de la
+    ultima ventana con voz.
+    """
+
+    def __init__(self):
+        self.speech_seen = False
+        self.trailing_silence = 0  # muestras
+        self.pending = b""         # resto de una ventana incompleta
+
+    def feed(self, pcm):
+        """
+        Agrega PCM int16 recien llegado. Devuelve True si contiene voz.
+        """
+        data = self.pending + pcm
+        usable = len(data) // (2 * FRAME_SAMPLES) * (2 * FRAME_SAMPLES)
+        self.pending = data[usable:]
+        if not usable:
+            return False
+
+        frames = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32).reshape(-1, FRAME_SAMPLES)
+        speech = np.sqrt(np.mean(np.square(frames), axis=1)) >= ENDPOINT_SPEECH_RMS
+        if not speech.any():
+            self.trailing_silence += len(speech) * FRAME_SAMPLES
+            return False
+
+        self.speech_seen = True
+        lastSpeech = len(speech) - 1 - int(np.argmax(speech[::-1]))
+        self.trailing_silence = (len(speech) - 1 - lastSpeech) * FRAME_SAMPLES
+        return True
+
+    def ended(self):
+        """
+        Hubo voz y ya le siguen ENDPOINT_SILENCE_MS de silencio.
+        """
+        return self.speech_seen and self.trailing_silence >= ENDPOINT_SILENCE_MS * SAMPLE_RATE // 1000
+
+    def reset(self):
+        self.speech_seen = False
+        self.trailing_silence = 0
+        self.pending = b""
@@ -0,0 +1,37 @@
+import io
+import os
+import wave
+
+import numpy as np
+
+
+# Envolvente de la voz sintetizada, para mover la boca de la cara en sincronia
+LIPSYNC = os.getenv("LIPSYNC", "1") == "1"
+ENVELOPE_FRAME_MS = 20
+# RMS minimo usado como referencia, para que una oracion casi muda no se vea a boca abierta
+MIN_REFERENCE_RMS = 1000.0
+
+def wav_envelope(wav):
+    """
+    Envolvente RMS de un WAV en ventanas de ENVELOPE_FRAME_MS, calculada de
+    una vez con NumPy. Devuelve bytes: un nivel 0-255 por ventana, relativo
+    a la ventana mas fuerte de la oracion.
+    """
+    with wave.open(io.BytesIO(wav), 'rb') as wf:
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    window = max(1, rate * ENVELOPE_FRAME_MS // 1000)
+    count = -(-len(samples) // window)  # La ultima ventana se completa con silencio
+    if count == 0:
+        return b""
+    padded = np.zeros(count * window, dtype=np.float32)
+    padded[:len(samples)] = samples
+
+    rms = np.sqrt(np.mean(np.square(padded.reshape(count, window)), axis=1))
+    levels = rms / max(float(rms.max()), MIN_REFERENCE_RMS) * 255
+    return np.clip(levels, 0, 255).astype(np.uint8).tobytes()
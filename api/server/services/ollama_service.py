@@ -1,41 +1,136 @@
 # servicios/servicio_ollama.py
+import os
+
 import ollama
 
-ollamaRecord = []
+from services.conversation import ConversationStore, split_sentences, MAX_TURNS, TOKEN_BUDGET
+from services.response_cache import AnswerCache, file_version
+
+MODEL = 'kubibot:latest'
+OPTIONS = {
+    'num_predict': 70,
+    'temperature': 0.5
+}
+
+# Cuanto tiempo Ollama mantiene el modelo en memoria entre pedidos
+# (duracion como "30m", o -1 para no descargarlo nunca)
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "-1")
+KEEP_ALIVE = int(KEEP_ALIVE) if KEEP_ALIVE.lstrip("-").isdigit() else KEEP_ALIVE
+
+# Resumir los turnos que salen de la ventana del historial
+SUMMARIZE = os.getenv("OLLAMA_SUMMARIZE", "0") == "1"
+
+# Cache de respuestas a preguntas repetidas
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))   # respuestas guardadas
+# Modelfile con el que se creo MODEL; si cambia, las respuestas guardadas dejan de valer
+MODELFILE = os.getenv("OLLAMA_MODELFILE", os.path.join(os.path.dirname(__file__), "..", "..", "config", "Modelfile"))
+
+answerCache = AnswerCache(
+    ANSWER_CACHE_SIZE,
+    f"{MODEL}:{file_version(MODELFILE)}:{sorted(OPTIONS.items())}"
+)
+# Sesiones que pidieron no usar la cache (el historial puede cambiar la respuesta)
+cacheOptOut = set()
+
+def set_answer_cache(session_id, enabled):
+    """
+    Habilita o deshabilita la cache de respuestas para una sesion.
+    """
+    if enabled:
+        cacheOptOut.discard(session_id)
+    else:
+        cacheOptOut.add(session_id)
 
-def reset_record():
+def uses_answer_cache(session_id):
+    return ANSWER_CACHE and session_id not in cacheOptOut
+
+def summarize_messages(summary, messages):
     """
-    Resetea el historial de la conversación.
+    Condensa el resumen anterior y los mensajes descartados en un resumen corto.
+    Si Ollama falla se conserva el resumen anterior.
     """
-    global ollamaRecord
-    ollamaRecord = []
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = (
+        "Resume en una sola oración, en español, los datos importantes de esta conversación.\n"
+        f"Resumen previo: {summary or 'ninguno'}\n{transcript}"
+    )
+    try:
+        respuesta_ollama = ollama.generate(model=MODEL, prompt=prompt, options=OPTIONS, keep_alive=KEEP_ALIVE)
+        return respuesta_ollama['response'].strip()
+    except Exception as e:
+        print(f"Error al resumir el historial: {e}")
+        return summary
+
+conversationStore = ConversationStore(MAX_TURNS, TOKEN_BUDGET, summarize_messages if SUMMARIZE else None)
+
+def load_model():
+    """
+    Carga el modelo en Ollama (un pedido vacio) y lo deja residente segun KEEP_ALIVE.
+    """
+    ollama.generate(model=MODEL, prompt="", keep_alive=KEEP_ALIVE)
+
+def reset_record(session_id):
+    """
+    Resetea el historial de la conversación de una sesión.
+    """
+    conversationStore.reset(session_id)
     #print("Historial de conversación reseteado.")
 
-def ollama_generate_answer(prompt):
+def drop_record(session_id):
+    """
+    Elimina el historial de una sesión (por ejemplo, al desconectarse).
     """
-    Toma un prompt de texto, lo envia a Ollama y devuelve la respuesta.
+    conversationStore.drop(session_id)
+    cacheOptOut.discard(session_id)
+
+def record_turn(session_id, prompt, sentences):
+    """
+    Guarda un turno respondido con record=False (ya confirmado) en el
+    historial de la sesion y en la cache de respuestas.
+    """
+    conversationStore.add_turn(session_id, prompt, " ".join(sentences))
+    if uses_answer_cache(session_id):
+        answerCache.put(prompt, list(sentences))
+
+def ollama_stream_answer(session_id, prompt, record=True):
+    """
+    Envia el prompt a Ollama con el historial de la sesion y va entregando
+    la respuesta oracion por oracion a medida que Ollama genera los tokens.
+    Al terminar guarda el turno completo en el historial de la sesion
+    (salvo con record=False, para respuestas especulativas: esas tampoco
+    se guardan en la cache hasta que `record_turn` las confirma).
+    Si la pregunta ya se respondio antes, se entrega la respuesta guardada.
     Lanza una excepcion si falla.
     """
-    ollamaRecord.append({'role': 'user', 'content': prompt})
-    print(f"Enviando prompt a Ollama: {prompt}")
+    useCache = uses_answer_cache(session_id)
+    if useCache:
+        cached = answerCache.get(prompt)
+        if cached:
+            print(f"Respuesta en cache para: {prompt}")
+            yield from conversationStore.stream_turn(session_id, prompt, cached, record)
+            return
+
+    print(f"Enviando prompt a Ollama (streaming): {prompt}")
     try:
-        respuesta_ollama = ollama.chat(
-            model='kubibot:latest',
-            messages=ollamaRecord,
-            options={
-                'num_predict': 70,
-                'temperature': 0.5
-            }
+        stream = ollama.chat(
+            model=MODEL,
+            messages=conversationStore.messages(session_id, prompt),
+            options=OPTIONS,
+            keep_alive=KEEP_ALIVE,
+            stream=True
             )
 
-        generatedAnswer = respuesta_ollama['message']['content']
-
-        ollamaRecord.append({'role': 'assistant', 'content': generatedAnswer})
+        generatedParts = []
+        fragments = (part['message']['content'] for part in stream)
+        for sentence in conversationStore.stream_turn(session_id, prompt, split_sentences(fragments), record):
+            generatedParts.append(sentence)
+            yield sentence
 
-        #print(f"Ollama respondió: {generatedAnswer}")
-        return generatedAnswer
+        if useCache and record:
+            answerCache.put(prompt, generatedParts)
 
     except Exception as e:
         print(f"Error al contactar Ollama: {e}")
         # Se lanza la excepcion
-        raise Exception(f"Error en el servicio Ollama: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error en el servicio Ollama: {str(e)}")
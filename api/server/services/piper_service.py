@@ -1,15 +1,107 @@
+import io
 import os
-import subprocess
-import uuid
+import queue
+import threading
+import wave
+
+from piper import PiperVoice
+
+from services.response_cache import AudioCache, file_stamp
 
 
 # Configuracion TTS (Piper)
 # Se puede sobreescribir con variables de entorno.
-PIPER_BINARY = os.getenv("PIPER_BINARY", "piper")
 VOICE_MODEL = os.path.expanduser(
     os.getenv("PIPER_VOICE_MODEL", "~/piper-voices/es_AR-daniela-high.onnx")
 )
+# Cantidad de voces cargadas en memoria (una por sintesis simultanea)
+POOL_SIZE = int(os.getenv("PIPER_POOL_SIZE", "2"))
+# Cache de audio sintetizado: tope en memoria y carpeta opcional en disco
+TTS_CACHE_MB = float(os.getenv("TTS_CACHE_MB", "64"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or None
+
+audioCache = AudioCache(int(TTS_CACHE_MB * 1024 * 1024), TTS_CACHE_DIR)
+# La voz entra en la clave con la version del modelo y de su configuracion:
+# si se reemplaza el .onnx en la misma ruta, el audio guardado en disco deja de valer
+VOICE_VERSION = f"{VOICE_MODEL}:{file_stamp(VOICE_MODEL)}:{file_stamp(VOICE_MODEL + '.json')}"
+
+
+class PiperPool:
+    """
+    Pool de sintetizadores Piper de larga vida.
+
+    Cada worker carga el modelo ONNX una sola vez y se reutiliza entre
+    respuestas; el texto y el audio se manejan en memoria, sin archivos.
+    """
+
+    def __init__(self, model_path, size):
+        self.model_path = model_path
+        self.size = max(1, size)
+        self.voices = queue.Queue()
+        for _ in range(self.size):
+            self.voices.put(PiperVoice.load(model_path))
+        # Todas las voces usan el mismo modelo, por lo que comparten frecuencia
+        self.sample_rate = self.voices.queue[0].config.sample_rate
+
+    def synthesize(self, text):
+        """
+        Sintetiza el texto con la primera voz libre y devuelve PCM int16 mono.
+        Si todas las voces estan ocupadas, espera a que se libere una.
+        """
+        voice = self.voices.get()
+        try:
+            if hasattr(voice, "synthesize_wav"):
+                # piper-tts >= 1.3: synthesize entrega AudioChunk
+                return b"".join(chunk.audio_int16_bytes for chunk in voice.synthesize(text))
+            return b"".join(voice.synthesize_stream_raw(text))
+        finally:
+            self.voices.put(voice)
+
+
+piperPool = None
+poolLock = threading.Lock()
+
+def get_pool():
+    """
+    Devuelve el pool de Piper, creandolo (y cargando los modelos) la primera vez.
+    """
+    global piperPool
+    with poolLock:
+        if piperPool is None:
+            print(f"Cargando {POOL_SIZE} voces de Piper: {VOICE_MODEL}")
+            piperPool = PiperPool(VOICE_MODEL, POOL_SIZE)
+    return piperPool
 
+def warm_up_pool():
+    """
+    Carga las voces y sintetiza un texto corto con cada una, para que la
+    primera respuesta real no pague la inicializacion de ONNX.
+    """
+    pool = get_pool()
+    voices = [pool.voices.get() for _ in range(pool.size)]
+    try:
+        for voice in voices:
+            if hasattr(voice, "synthesize_wav"):
+                for _ in voice.synthesize("Hola."):
+                    pass
+            else:
+                for _ in voice.synthesize_stream_raw("Hola."):
+                    pass
+    finally:
+        for voice in voices:
+            pool.voices.put(voice)
+
+def pcm_to_wav(pcm, sample_rate):
+    """
+    Empaqueta PCM int16 mono en un WAV en memoria.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
 
 def generate_tts_response(text: str):
     """
@@ -21,29 +113,33 @@ def generate_tts_response(text: str):
     if not text:
         return None
 
-    temp_wav = f"tts_response_{uuid.uuid4().hex}.wav"
     processed_text = text.replace('"', "").replace("'", "")
 
     try:
-        # Piper acepta texto por stdin; evitamos shell=True.
-        subprocess.run(
-            [PIPER_BINARY, "--model", VOICE_MODEL, "--output_file", temp_wav],
-            input=processed_text,
-            text=True,
-            check=True,
-            stderr=subprocess.DEVNULL,
-        )
-
-        if os.path.exists(temp_wav):
-            with open(temp_wav, "rb") as f:
-                return f.read()
+        pool = get_pool()
+        cacheKey = AudioCache.key(VOICE_VERSION, processed_text)
+        pcm = audioCache.get(cacheKey)
+        if pcm is None:
+            pcm = pool.synthesize(processed_text)
+            if not pcm:
+                return None
+            audioCache.put(cacheKey, pcm)
 
-        return None
+        return pcm_to_wav(pcm, pool.sample_rate)
 
     except Exception as e:
         print(f"Error generando TTS: {e}")
         return None
 
-    finally:
-        if os.path.exists(temp_wav):
-            os.remove(temp_wav)
+def preload_tts_phrases(phrases):
+    """
+    Sintetiza de antemano frases fijas (errores, saludos) y las deja fijas
+    en la cache, para responderlas sin pasar por Piper.
+    """
+    pool = get_pool()
+    for phrase in phrases:
+        processed_text = phrase.replace('"', "").replace("'", "")
+        cacheKey = AudioCache.key(VOICE_VERSION, processed_text)
+        pcm = audioCache.get(cacheKey) or pool.synthesize(processed_text)
+        if pcm:
+            audioCache.put(cacheKey, pcm, pinned=True)
@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+
+from services.endpoint_service import ENDPOINT_SPEECH_RMS
+
+
+# Preprocesamiento del audio de cada turno antes del STT: recorte del
+# silencio inicial y final, normalizacion de ganancia y descarte del ruido
+PREPROCESS = os.getenv("AUDIO_PREPROCESS", "1") == "1"
+# Detector de voz: silero (el de faster-whisper), webrtc (requiere webrtcvad) o energy
+PREPROCESS_VAD = os.getenv("PREPROCESS_VAD", "silero")
+# Margen de audio que se conserva antes y despues de la voz
+PREPROCESS_PAD_MS = int(os.getenv("PREPROCESS_PAD_MS", "200"))
+# Con menos voz que esto el turno se considera ruido y no pasa por los modelos
+PREPROCESS_MIN_SPEECH_MS = int(os.getenv("PREPROCESS_MIN_SPEECH_MS", "250"))
+# Nivel RMS al que se lleva la voz y ganancia maxima permitida
+PREPROCESS_TARGET_DBFS = float(os.getenv("PREPROCESS_TARGET_DBFS", "-20"))
+PREPROCESS_MAX_GAIN = float(os.getenv("PREPROCESS_MAX_GAIN", "10"))
+
+VAD_SILERO = "silero"
+VAD_WEBRTC = "webrtc"
+VAD_ENERGY = "energy"
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = SAMPLE_RATE // 50  # 20 ms
+TARGET_RMS = 32768.0 * 10 ** (PREPROCESS_TARGET_DBFS / 20)
+MAX_PEAK = 0.95 * 32767
+
+
+class NoSpeechError(ValueError):
+    """
+    El audio del turno no contiene voz: se descarta antes de llegar a los modelos.
+    """
+
+
+vadMode = None
+webrtcVad = None
+
+def get_vad_mode():
+    """
+    Modo de VAD efectivo. Si silero no esta disponible (por ejemplo, con
+    otro motor de STT instalado) se usa el detector por energia.
+    """
+    global vadMode, webrtcVad
+    if vadMode is None:
+        mode = PREPROCESS_VAD
+        if mode == VAD_SILERO:
+            try:
+                import faster_whisper.vad  # noqa: F401
+            except ImportError:
+                print("VAD silero no disponible (requiere faster-whisper), se usa el de energia")
+                mode = VAD_ENERGY
+        elif mode == VAD_WEBRTC:
+            import webrtcvad
+            webrtcVad = webrtcvad.Vad(2)
+        elif mode != VAD_ENERGY:
+            raise ValueError(f"Modo de VAD desconocido: {mode}")
+        vadMode = mode
+    return vadMode
+
+def _frames_to_regions(speech):
+    """
+    Ventanas de 20 ms marcadas como voz -> lista de (inicio, fin) en muestras.
+    """
+    regions = []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        regions.append((int(start) * FRAME_SAMPLES, int(end) * FRAME_SAMPLES))
+    return regions
+
+def speech_regions(samples):
+    """
+    Tramos con voz del audio (int16) como lista de (inicio, fin) en muestras.
+    """
+    mode = get_vad_mode()
+    if mode == VAD_SILERO:
+        from faster_whisper.vad import get_speech_timestamps, VadOptions
+        timestamps = get_speech_timestamps(
+            samples.astype(np.float32) / 32768.0,
+            VadOptions(min_speech_duration_ms=PREPROCESS_MIN_SPEECH_MS, speech_pad_ms=0)
+        )
+        return [(t['start'], t['end']) for t in timestamps]
+
+    count = len(samples) // FRAME_SAMPLES
+    frames = samples[:count * FRAME_SAMPLES].reshape(count, FRAME_SAMPLES)
+    if mode == VAD_WEBRTC:
+        speech = np.array([webrtcVad.is_speech(frame.tobytes(), SAMPLE_RATE) for frame in frames], dtype=bool)
+    else:
+        speech = np.sqrt(np.mean(np.square(frames.astype(np.float32)), axis=1)) >= ENDPOINT_SPEECH_RMS
+    return _frames_to_regions(speech)
+
+def preprocess_audio(pcm, trim_start=True):
+    """
+    Recorta el silencio que rodea a la voz (dejando PREPROCESS_PAD_MS de
+    margen) y lleva la voz a PREPROCESS_TARGET_DBFS sin saturar.
+    Con trim_start=False se conserva el comienzo, porque la transcripcion
+    incremental guarda posiciones respecto del inicio del buffer.
+    Lanza NoSpeechError si no hay voz suficiente.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    regions = speech_regions(samples)
+    speechSamples = sum(end - start for start, end in regions)
+    if speechSamples < PREPROCESS_MIN_SPEECH_MS * SAMPLE_RATE // 1000:
+        raise NoSpeechError("No se detectó voz en el audio")
+
+    pad = PREPROCESS_PAD_MS * SAMPLE_RATE // 1000
+    start = max(0, regions[0][0] - pad) if trim_start else 0
+    end = min(len(samples), regions[-1][1] + pad)
+    audio = samples[start:end].astype(np.float32)
+
+    # La ganancia se calcula solo sobre la voz, para que el silencio no la infle
+    voice = np.concatenate([samples[s:e] for s, e in regions]).astype(np.float32)
+    rms = float(np.sqrt(np.mean(np.square(voice))))
+    peak = float(np.abs(audio).max())
+    gain = min(TARGET_RMS / max(rms, 1.0), PREPROCESS_MAX_GAIN, MAX_PEAK / max(peak, 1.0))
+    return np.clip(audio * gain, -32768, 32767).astype(np.int16).tobytes()
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+# Signos y simbolos que no cambian la pregunta ("¿Cómo te llamas?" == "como te llamas")
+NON_WORD = re.compile(r"[^\w\s]")
+SPACES = re.compile(r"\s+")
+
+def normalize_text(text):
+    """
+    Normaliza un texto para usarlo como clave: minusculas, sin tildes,
+    sin puntuacion y con espacios simples.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = NON_WORD.sub(" ", text)
+    return SPACES.sub(" ", text).strip()
+
+def file_version(path):
+    """
+    Huella corta del contenido de un archivo (por ejemplo, el Modelfile),
+    o cadena vacia si no existe. Cambia si se edita el archivo.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()[:12]
+    except OSError:
+        return ""
+
+
+def file_stamp(path):
+    """
+    Version barata de un archivo grande (por ejemplo, un modelo de voz):
+    tamano y fecha de modificacion, o cadena vacia si no existe.
+    """
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return ""
+
+
+class AnswerCache:
+    """
+    Primer nivel: transcripcion normalizada -> oraciones de la respuesta.
+
+    La clave incluye la version del modelo, asi un cambio de modelo o de
+    Modelfile invalida las respuestas guardadas. Se descartan las menos
+    usadas al superar `max_entries`.
+    """
+
+    def __init__(self, max_entries, version):
+        self.max_entries = max(1, max_entries)
+        self.version = version
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, prompt):
+        return f"{self.version}\0{normalize_text(prompt)}"
+
+    def get(self, prompt):
+        key = self._key(prompt)
+        with self.lock:
+            sentences = self.entries.get(key)
+            if sentences is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(sentences)
+
+    def put(self, prompt, sentences):
+        if not sentences:
+            return
+        key = self._key(prompt)
+        with self.lock:
+            self.entries[key] = tuple(sentences)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class AudioCache:
+    """
+    Segundo nivel: texto + voz -> PCM sintetizado.
+
+    En memoria es un LRU acotado por bytes; las entradas fijadas (frases de
+    error y saludos) nunca se descartan. Si se indica `disk_dir`, cada audio
+    tambien se guarda en disco y sobrevive a reinicios del servidor.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        self.pinned = set()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(voice, text):
+        return hashlib.sha1(f"{voice}\0{text}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pcm")
+
+    def get(self, key):
+        with self.lock:
+            pcm = self.entries.get(key)
+            if pcm is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return pcm
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    pcm = f.read()
+            except OSError:
+                pcm = None
+            if pcm:
+                self._store(key, pcm)
+                with self.lock:
+                    self.hits += 1
+                return pcm
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, pcm, pinned=False):
+        self._store(key, pcm, pinned)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                # Se escribe aparte y se renombra para no dejar archivos a medias
+                with open(path + ".tmp", 'wb') as f:
+                    f.write(pcm)
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                print(f"No se pudo guardar el audio en cache: {e}")
+
+    def _store(self, key, pcm, pinned=False):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = pcm
+            self.size += len(pcm)
+            if pinned:
+                self.pinned.add(key)
+
+            for oldKey in list(self.entries):
+                if self.size <= self.max_bytes:
+                    break
+                if oldKey in self.pinned or oldKey == key:
+                    continue
+                self.size -= len(self.entries.pop(oldKey))
@@ -1,31 +1,300 @@
-import speech_recognition as sr
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 
-# Reconcocedor de voz
-r = sr.Recognizer()
+import numpy as np
+from faster_whisper import WhisperModel
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
 
-def transcribe_audio_file(ruta_archivo):
+
+# Configuracion STT (faster-whisper)
+# Se puede sobreescribir con variables de entorno.
+MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# Transcripciones que el modelo puede atender en paralelo
+NUM_WORKERS = int(os.getenv("WHISPER_WORKERS", "1"))
+LANGUAGE = "es"
+
+# Formato del audio que envian los clientes
+SAMPLE_RATE = 16000
+
+# Transcripcion incremental mientras llegan los chunks
+STREAMING = os.getenv("WHISPER_STREAMING", "1") == "1"
+# Cada cuantos segundos de audio nuevo se decodifica la ventana pendiente
+STREAM_STEP_SECONDS = float(os.getenv("WHISPER_STREAM_STEP_SECONDS", "2.0"))
+# Los segmentos que terminan a menos de este margen del final no se confirman,
+# porque la palabra puede seguir en el proximo chunk
+STREAM_MARGIN_SECONDS = float(os.getenv("WHISPER_STREAM_MARGIN_SECONDS", "1.0"))
+
+# Agrupacion de transcripciones de distintas sesiones en una sola pasada del modelo
+BATCHING = os.getenv("WHISPER_BATCHING", "0") == "1"
+# Cuanto se espera a que lleguen mas audios antes de lanzar el lote
+BATCH_WINDOW_SECONDS = float(os.getenv("WHISPER_BATCH_WINDOW_MS", "50")) / 1000
+BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "4"))
+# Whisper trabaja en ventanas de 30 s; los audios mas largos van por el camino normal
+BATCH_MAX_SAMPLES = 30 * SAMPLE_RATE
+# Largo maximo de la secuencia de tokens que genera el decodificador
+MAX_TOKENS = 448
+
+whisperModel = None
+modelLock = threading.Lock()
+
+def load_model():
     """
-    Toma la ruta de un archivo de audio, lo procesa con Whisper
-    y devuelve el texto.
-    Lanza una excepción si no puede entenderlo.
+    Carga el modelo de Whisper una sola vez y lo deja en memoria.
     """
-    #print("Procesando audio con Whisper...")
-    try:
-        # Se utiliza el archivo de audio
-        with sr.AudioFile(ruta_archivo) as source:
-            audio_data = r.record(source)
+    global whisperModel
+    with modelLock:
+        if whisperModel is None:
+            print(f"Cargando Whisper '{MODEL_SIZE}' ({DEVICE}, {COMPUTE_TYPE})...")
+            whisperModel = WhisperModel(
+                MODEL_SIZE,
+                device=DEVICE,
+                compute_type=COMPUTE_TYPE,
+                num_workers=NUM_WORKERS
+            )
+    return whisperModel
 
-        # Se realiza la transcripcion con Whisper
-        text = r.recognize_whisper(audio_data, language="spanish", model="base")
+def warm_up_model():
+    """
+    Carga el modelo y hace una transcripcion corta de silencio, para que
+    la primera transcripcion real no pague la inicializacion del motor.
+    """
+    model = load_model()
+    silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+    list(model.transcribe(silence, language=LANGUAGE, beam_size=1)[0])
+    if BATCHING:
+        get_batcher().transcribe(silence)
 
-        #print(f"Whisper reconoció: {text}")
-        return text
+def pcm_to_float(pcm):
+    """
+    Convierte PCM int16 mono a un arreglo float32 en [-1, 1] sin copiar a disco.
+    """
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+def transcribe_audio(pcm):
+    """
+    Toma audio PCM int16 a 16 kHz (tal como llega del cliente),
+    lo procesa con Whisper y devuelve el texto.
+    Lanza una excepción si no puede entenderlo.
+    """
+    model = load_model()
+    audio = pcm_to_float(pcm)
+
+    if BATCHING and len(audio) <= BATCH_MAX_SAMPLES:
+        text = get_batcher().transcribe(audio)
+    else:
+        segments, _ = model.transcribe(audio, language=LANGUAGE, beam_size=1)
+        text = " ".join(segment.text.strip() for segment in segments).strip()
 
-    except sr.UnknownValueError:
-        #print("Whisper no pudo entender el audio")
-        # Relanzamos el error para que la API lo capture
+    if not text:
+        # Se lanza el error para que la API lo capture
         raise ValueError("Whisper no pudo entender el audio")
-    except Exception as e:
-        #print(f"Error en el servicio Whisper: {e}")
-        raise e # Se relanza la excepcion
 
+    #print(f"Whisper reconoció: {text}")
+    return text
+
+
+class TranscriptionBatcher(threading.Thread):
+    """
+    Agrupa los audios que llegan casi al mismo tiempo desde distintas
+    sesiones y los transcribe en una sola pasada del modelo.
+
+    El primer audio abre una ventana de `window_seconds`; el lote se lanza
+    al cerrarse la ventana o al juntar `max_batch` audios. Cada audio se
+    rellena a 30 s, el encoder procesa el lote completo y el decodificador
+    genera todas las secuencias juntas. Quien llama a `transcribe` espera
+    en su propio hilo hasta que su resultado esta listo.
+    """
+
+    def __init__(self, window_seconds, max_batch):
+        super().__init__(daemon=True)
+        self.window_seconds = window_seconds
+        self.max_batch = max(1, max_batch)
+        self.requests = queue.Queue()
+        self.tokenizer = None
+
+    def transcribe(self, audio, previous_text=None):
+        """
+        Encola un audio float32 (hasta 30 s) y devuelve su texto.
+        `previous_text` se usa como contexto del decodificador.
+        """
+        future = Future()
+        self.requests.put((audio, previous_text, future))
+        return future.result()
+
+    def run(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.monotonic() + self.window_seconds
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Los prompts de un mismo lote deben tener el mismo largo
+            groups = {}
+            for audio, previous_text, future in batch:
+                prompt = self._prompt(previous_text)
+                groups.setdefault(len(prompt), []).append((audio, prompt, future))
+
+            for group in groups.values():
+                try:
+                    texts = self._decode_batch(group)
+                except Exception as e:
+                    for _, _, future in group:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), text in zip(group, texts):
+                    future.set_result(text)
+
+    def _get_tokenizer(self):
+        if self.tokenizer is None:
+            model = load_model()
+            self.tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual,
+                                       task="transcribe", language=LANGUAGE)
+        return self.tokenizer
+
+    def _prompt(self, previous_text):
+        tokenizer = self._get_tokenizer()
+        prompt = []
+        if previous_text:
+            prompt.append(tokenizer.sot_prev)
+            # Como en faster-whisper, el contexto ocupa a lo sumo la mitad de la secuencia
+            prompt.extend(tokenizer.encode(" " + previous_text.strip())[-(MAX_TOKENS // 2 - 1):])
+        prompt.extend(tokenizer.sot_sequence)
+        prompt.append(tokenizer.no_timestamps)
+        return prompt
+
+    def _decode_batch(self, group):
+        model = load_model()
+        tokenizer = self._get_tokenizer()
+
+        features = np.stack([pad_or_trim(model.feature_extractor(audio)) for audio, _, _ in group])
+        encoderOutput = model.encode(features)
+        results = model.model.generate(
+            encoderOutput,
+            [prompt for _, prompt, _ in group],
+            beam_size=1,
+            max_length=MAX_TOKENS,
+            suppress_blank=True,
+            suppress_tokens=[-1],
+        )
+        return [
+            tokenizer.decode([token for token in result.sequences_ids[0] if token < tokenizer.eot]).strip()
+            for result in results
+        ]
+
+
+transcriptionBatcher = None
+batcherLock = threading.Lock()
+
+def get_batcher():
+    """
+    Crea y arranca el agrupador de transcripciones la primera vez que se usa.
+    """
+    global transcriptionBatcher
+    with batcherLock:
+        if transcriptionBatcher is None:
+            transcriptionBatcher = TranscriptionBatcher(BATCH_WINDOW_SECONDS, BATCH_SIZE)
+            transcriptionBatcher.start()
+    return transcriptionBatcher
+
+
+class StreamingTranscription:
+    """
+    Transcripcion incremental de una sesion.
+
+    Mientras llega el audio se decodifica en ventanas desde el ultimo punto
+    confirmado: los segmentos estables se confirman y el resto queda como
+    hipotesis parcial. Al terminar solo falta decodificar la cola.
+    """
+
+    def __init__(self):
+        self.committed_text = []
+        self.committed_samples = 0
+        self.decoded_samples = 0
+        self.partial_text = ""
+        self.busy = False
+        # Serializa las decodificaciones de una misma sesion
+        self.lock = threading.Lock()
+
+    def should_decode(self, total_samples):
+        """
+        Indica si hay suficiente audio nuevo para una decodificacion parcial.
+        """
+        return (not self.busy
+                and total_samples - self.decoded_samples >= STREAM_STEP_SECONDS * SAMPLE_RATE)
+
+    def text(self):
+        return " ".join(self.committed_text + [self.partial_text]).strip()
+
+    def _transcribe_tail(self, pcm):
+        audio = pcm_to_float(pcm)[self.committed_samples:]
+        segments, _ = load_model().transcribe(
+            audio,
+            language=LANGUAGE,
+            beam_size=1,
+            initial_prompt=" ".join(self.committed_text) or None
+        )
+        return audio, list(segments)
+
+    def decode(self, pcm):
+        """
+        Decodifica el audio pendiente y devuelve la transcripcion parcial
+        (confirmada mas hipotesis).
+        """
+        with self.lock:
+            total_samples = len(pcm) // 2
+            audio, segments = self._transcribe_tail(pcm)
+
+            stable_until = len(audio) / SAMPLE_RATE - STREAM_MARGIN_SECONDS
+            committed_until = 0
+            partial = []
+            for segment in segments:
+                if not partial and segment.end <= stable_until:
+                    self.committed_text.append(segment.text.strip())
+                    committed_until = int(segment.end * SAMPLE_RATE)
+                else:
+                    partial.append(segment.text.strip())
+
+            # El punto confirmado avanza hasta el final del ultimo segmento estable
+            self.committed_samples += committed_until
+
+            self.partial_text = " ".join(partial)
+            self.decoded_samples = total_samples
+            return self.text()
+
+    def finish(self, pcm, commit=True):
+        """
+        Decodifica solo la cola no confirmada y devuelve el texto final.
+        Con commit=False (turno especulativo) no modifica el estado de la sesion.
+        Lanza una excepción si no hay nada que entender.
+        """
+        with self.lock:
+            committed = list(self.committed_text)
+            tail = pcm_to_float(pcm)[self.committed_samples:]
+            if BATCHING and len(tail) <= BATCH_MAX_SAMPLES:
+                # La cola se agrupa con los finales de otras sesiones
+                tailText = get_batcher().transcribe(tail, " ".join(committed))
+                if tailText:
+                    committed.append(tailText)
+            else:
+                _, segments = self._transcribe_tail(pcm)
+                committed.extend(segment.text.strip() for segment in segments)
+            text = " ".join(committed).strip()
+            if commit:
+                self.committed_text = committed
+                self.partial_text = ""
+
+        if not text:
+            raise ValueError("Whisper no pudo entender el audio")
+        return text
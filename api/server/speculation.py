@@ -0,0 +1,104 @@
+import time
+
+from eventlet.event import Event
+from eventlet.queue import Queue
+
+
+_DONE = object()
+
+
+class Speculation:
+    """
+    Turno adelantado: STT y LLM corren sobre el audio recibido hasta que el
+    servidor predijo el fin del enunciado, antes de que llegue `end_of_audio`.
+
+    Las oraciones del LLM se guardan en una cola; si el turno se confirma,
+    `process_turn` las consume como si vinieran del modelo. Si llega mas voz
+    se cancela y el trabajo se descarta. El LLM corre sin guardar el turno en
+    el historial: se guarda recien cuando el turno se confirma.
+
+    La especulacion ocupa un cupo del planificador desde que empieza. Si se
+    confirma, el cupo pasa al turno (`take_slot`); si se cancela, se devuelve
+    con `release` apenas termina el trabajo en curso.
+    """
+
+    def __init__(self, pcm, release):
+        self.pcm = pcm
+        self.release = release
+        self.holds_slot = True
+        self.finished = False
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self.text = None
+        self.error = None
+        self.transcribed = Event()
+        self.sentences = Queue()
+
+    def cancel(self):
+        self.cancelled = True
+        if self.finished:
+            self._release_slot()
+
+    def take_slot(self):
+        """
+        Confirma la especulacion y le pasa su cupo al turno. Devuelve False
+        si ya no lo tenia.
+        """
+        held = self.holds_slot
+        self.holds_slot = False
+        return held
+
+    def _release_slot(self):
+        if self.holds_slot:
+            self.holds_slot = False
+            self.release()
+
+    def run(self, transcribe, answer):
+        """
+        transcribe(pcm) -> texto; answer(texto) -> generador de oraciones.
+        """
+        try:
+            self.text = transcribe(self.pcm)
+        except Exception as e:
+            self.error = e
+        self.transcribed.send()
+
+        if self.error is None and not self.cancelled:
+            stream = answer(self.text)
+            try:
+                for sentence in stream:
+                    self.sentences.put(sentence)
+                    # Cancelado: se suelta el cupo del LLM sin esperar al resto
+                    if self.cancelled:
+                        break
+            except Exception as e:
+                self.error = e
+            finally:
+                # Cierra el generador del LLM (y su stream) si se corto antes de terminar
+                stream.close()
+        self.sentences.put(_DONE)
+
+        self.finished = True
+        if self.cancelled:
+            self._release_slot()
+
+    def transcript(self):
+        """
+        Espera la transcripcion especulativa. Lanza su excepcion si fallo.
+        """
+        self.transcribed.wait()
+        if self.error is not None and self.text is None:
+            raise self.error
+        return self.text
+
+    def answer(self):
+        """
+        Oraciones del LLM a medida que estan listas. Lanza su excepcion si fallo.
+        """
+        while True:
+            sentence = self.sentences.get()
+            if sentence is _DONE:
+                break
+            yield sentence
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los modulos del servidor se importan relativos a api/server, como en server_api.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from services.conversation import ConversationStore, split_sentences, estimate_tokens
+
+
+def roles(store, session_id):
+    return [m['role'] for m in store.conversations[session_id].messages]
+
+def contents(store, session_id):
+    return [m['content'] for m in store.conversations[session_id].messages]
+
+def answer(store, session_id, prompt, sentences, record=True):
+    return list(store.stream_turn(session_id, prompt, sentences, record))
+
+
+def test_split_sentences_across_fragments():
+    fragments = ["Hola. Cuesta 3", ".5 pesos! ¿Algo", " más?   Fin"]
+    assert list(split_sentences(fragments)) == ["Hola.", "Cuesta 3.5 pesos!", "¿Algo más?", "Fin"]
+
+def test_split_sentences_skips_empty():
+    assert list(split_sentences(["", "  ", "Sí."])) == ["Sí."]
+    assert list(split_sentences([])) == []
+
+
+def test_window_keeps_last_turns_in_pairs():
+    store = ConversationStore(max_turns=2, token_budget=10_000)
+    for i in range(5):
+        answer(store, "s", f"p{i}", [f"r{i}"])
+    assert contents(store, "s") == ["p3", "r3", "p4", "r4"]
+    assert roles(store, "s") == ["user", "assistant", "user", "assistant"]
+
+def test_token_budget_trims_whole_turns():
+    store = ConversationStore(max_turns=10, token_budget=30)
+    answer(store, "s", "a" * 40, ["b" * 40])   # ~22 tokens
+    answer(store, "s", "c" * 20, ["d" * 20])   # ~12 tokens
+    assert contents(store, "s") == ["c" * 20, "d" * 20]
+    assert roles(store, "s")[0] == "user"
+    conversation = store.conversations["s"]
+    assert conversation.tokens == sum(estimate_tokens(m['content']) for m in conversation.messages)
+
+def test_newest_turn_is_kept_even_over_budget():
+    store = ConversationStore(max_turns=3, token_budget=10)
+    answer(store, "s", "corta", ["respuesta"])
+    answer(store, "s", "x" * 200, ["y" * 200])
+    assert contents(store, "s") == ["x" * 200, "y" * 200]
+
+def test_messages_include_summary_and_prompt():
+    store = ConversationStore(max_turns=2, token_budget=10_000)
+    answer(store, "s", "p0", ["r0"])
+    store.conversations["s"].summary = "se llama Ana"
+    messages = store.messages("s", "p1")
+    assert messages[0]['content'].endswith("se llama Ana)")
+    assert messages[1:] == [
+        {'role': 'user', 'content': 'p0'},
+        {'role': 'assistant', 'content': 'r0'},
+        {'role': 'user', 'content': 'p1'},
+    ]
+
+
+def test_record_false_does_not_touch_history():
+    store = ConversationStore(max_turns=2, token_budget=10_000)
+    assert answer(store, "s", "p", ["Uno.", "Dos."], record=False) == ["Uno.", "Dos."]
+    assert contents(store, "s") == []
+    store.add_turn("s", "p", "Uno. Dos.")
+    assert contents(store, "s") == ["p", "Uno. Dos."]
+
+def test_dropped_session_is_not_recreated():
+    store = ConversationStore(max_turns=2, token_budget=10_000)
+    turn = store.stream_turn("s", "p", iter(["Hola."]))
+    next(turn)
+    store.drop("s")  # El cliente se desconecta mientras se genera la respuesta
+    list(turn)
+    assert "s" not in store.conversations
+
+def test_summarize_runs_off_the_turn():
+    summarized = threading.Event()
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append([m['content'] for m in messages])
+        summarized.set()
+        return "resumen"
+
+    store = ConversationStore(max_turns=1, token_budget=10_000, summarize=summarize)
+    answer(store, "s", "p0", ["r0"])
+    answer(store, "s", "p1", ["r1"])
+    assert summarized.wait(2)
+    assert calls == [["p0", "r0"]]
+    for _ in range(100):
+        if store.conversations["s"].summary:
+            break
+        time.sleep(0.01)
+    assert store.conversations["s"].summary == "resumen"
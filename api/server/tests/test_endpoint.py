@@ -0,0 +1,54 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from services.endpoint_service import (
+    EndpointDetector, ENDPOINT_SILENCE_MS, ENDPOINT_SPEECH_RMS, FRAME_SAMPLES, SAMPLE_RATE
+)
+
+
+def tone(ms, level):
+    count = SAMPLE_RATE * ms // 1000
+    return np.full(count, level, dtype=np.int16).tobytes()
+
+def silence(ms):
+    return tone(ms, 0)
+
+SPEECH_LEVEL = int(ENDPOINT_SPEECH_RMS * 2)
+
+
+def test_silence_alone_never_ends():
+    detector = EndpointDetector()
+    assert not detector.feed(silence(ENDPOINT_SILENCE_MS * 4))
+    assert not detector.ended()
+
+def test_ends_after_trailing_silence():
+    detector = EndpointDetector()
+    assert detector.feed(tone(200, SPEECH_LEVEL))
+    detector.feed(silence(ENDPOINT_SILENCE_MS - 40))
+    assert not detector.ended()
+    detector.feed(silence(40))
+    assert detector.ended()
+
+def test_new_speech_resets_trailing_silence():
+    detector = EndpointDetector()
+    detector.feed(tone(200, SPEECH_LEVEL))
+    detector.feed(silence(ENDPOINT_SILENCE_MS))
+    assert detector.ended()
+    detector.feed(tone(40, SPEECH_LEVEL))
+    assert not detector.ended()
+
+def test_partial_frames_are_buffered():
+    detector = EndpointDetector()
+    half = tone(10, SPEECH_LEVEL)
+    assert not detector.feed(half)
+    assert len(detector.pending) == FRAME_SAMPLES
+    assert detector.feed(half)
+    assert detector.pending == b""
+
+def test_reset():
+    detector = EndpointDetector()
+    detector.feed(tone(200, SPEECH_LEVEL) + silence(ENDPOINT_SILENCE_MS))
+    detector.reset()
+    assert not detector.ended()
+    assert detector.pending == b""
@@ -0,0 +1,63 @@
+import os
+
+from services.response_cache import AnswerCache, AudioCache, normalize_text, file_stamp
+
+
+def test_normalize_text():
+    assert normalize_text("¿Cómo te LLAMAS?") == "como te llamas"
+    assert normalize_text("  hola,   ¡qué   tal!  ") == "hola que tal"
+
+
+def test_answer_cache_matches_normalized_prompt():
+    cache = AnswerCache(4, "v1")
+    cache.put("¿Cómo te llamas?", ["Me llamo Kubibot."])
+    assert cache.get("como te llamas") == ["Me llamo Kubibot."]
+    assert AnswerCache(4, "v2").get("como te llamas") is None
+
+def test_answer_cache_evicts_least_recently_used():
+    cache = AnswerCache(2, "v")
+    cache.put("a", ["A"])
+    cache.put("b", ["B"])
+    cache.get("a")
+    cache.put("c", ["C"])
+    assert cache.get("b") is None
+    assert cache.get("a") == ["A"]
+    assert cache.get("c") == ["C"]
+
+def test_answer_cache_ignores_empty_answers():
+    cache = AnswerCache(2, "v")
+    cache.put("a", [])
+    assert cache.get("a") is None
+
+
+def test_audio_cache_respects_byte_budget_and_pins():
+    cache = AudioCache(max_bytes=10)
+    cache.put("fija", b"1234", pinned=True)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")  # Se pasa del tope: sale "a", nunca la fijada
+    assert cache.get("fija") == b"1234"
+    assert cache.get("a") is None
+    assert cache.get("b") == b"12345"
+    assert cache.size == 9
+
+def test_audio_cache_replacing_entry_updates_size():
+    cache = AudioCache(max_bytes=100)
+    cache.put("a", b"123")
+    cache.put("a", b"12345")
+    assert cache.size == 5
+
+def test_audio_cache_disk_tier_survives_restart(tmp_path):
+    key = AudioCache.key("voz", "Hola.")
+    AudioCache(max_bytes=100, disk_dir=str(tmp_path)).put(key, b"pcm")
+    restarted = AudioCache(max_bytes=100, disk_dir=str(tmp_path))
+    assert restarted.get(key) == b"pcm"
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+def test_audio_key_depends_on_voice_version(tmp_path):
+    model = tmp_path / "voz.onnx"
+    model.write_bytes(b"modelo viejo")
+    before = file_stamp(str(model))
+    model.write_bytes(b"modelo nuevo, mas largo")
+    assert file_stamp(str(model)) != before
+    assert AudioCache.key(f"voz:{before}", "Hola.") != AudioCache.key(f"voz:{file_stamp(str(model))}", "Hola.")
+    assert file_stamp(str(tmp_path / "no-existe.onnx")) == ""
@@ -20,10 +20,37 @@
 #define SERVO_OFFSET 20 //!< Offset para restar al ángulo del servomotor
 #define SERVO_SECURITY_OFFSET 40 //!< Offset de seguridad al girar el servomotor
 
-#define STOP_SIGNAL 'S' //!< Senhal para detener el robot
-#define RESUME_SIGNAL 'R' //!< Senhal para reanudar el robot
+#define SERIAL_BAUD 115200 //!< Velocidad del enlace serial con la Raspberry Pi
 
-#define SERIAL_HANDSHAKE 'K' //!< Senhal de handshake serial
+#define SERIAL_TEXT_COMMANDS 0 //!< 1 = aceptar 'S' y 'R' en texto (solo para pruebas con el monitor serie)
+#define STOP_SIGNAL 'S' //!< Senhal de texto para detener el robot (pruebas)
+#define RESUME_SIGNAL 'R' //!< Senhal de texto para reanudar el robot (pruebas)
+
+/*
+ * Protocolo binario con la Raspberry Pi (ver api/client/serial_link/protocol.py)
+ * Trama: SYNC | TIPO | SEQ | LARGO | PAYLOAD | CRC8
+ * El CRC8 (polinomio 0x07) cubre TIPO, SEQ, LARGO y PAYLOAD.
+ */
+#define FRAME_SYNC 0xA5 //!< Byte de inicio de trama
+#define FRAME_MAX_PAYLOAD 8 //!< Largo maximo del payload
+#define DISTANCE_OUT_OF_RANGE 0xFFFF //!< Distancia codificada para objeto fuera de rango
+
+/**
+ * @brief Tipos de mensaje del protocolo serial
+ */
+enum MessageType : uint8_t {
+    MSG_STOP = 0x01,     //!< Pi -> Arduino: detener
+    MSG_RESUME = 0x02,   //!< Pi -> Arduino: reanudar
+    MSG_ACK = 0x03,      //!< Arduino -> Pi: confirma (tipo, seq)
+    MSG_DISTANCE = 0x10, //!< Arduino -> Pi: uint16 distancia en decimas de cm
+    MSG_SCAN = 0x11,     //!< Arduino -> Pi: uint16 izquierda, uint16 derecha
+    MSG_STATE = 0x12     //!< Arduino -> Pi: uint8 estado, uint8 direccion
+};
+
+/**
+ * @brief Estados del parser de tramas entrantes
+ */
+enum RxState {RX_SYNC, RX_TYPE, RX_SEQ, RX_LEN, RX_PAYLOAD, RX_CRC};
 
 /**
  * @brief Direcciones de rotación para el robot
@@ -35,6 +62,37 @@ enum RotationDirection {LEFT, RIGHT};
  */
 enum State {ADVANCING, REVERSING, TURNING, DETAINED};
 
+/**
+ * @brief Calcula el CRC8 (polinomio 0x07) de un bloque de bytes
+ *
+ * @param data Bytes a procesar
+ * @param len Cantidad de bytes
+ * @param crc Valor inicial (permite encadenar bloques)
+ * @return uint8_t CRC resultante
+ */
+uint8_t crc8(const uint8_t* data, uint8_t len, uint8_t crc){
+    for(uint8_t i = 0; i < len; i++){
+        crc ^= data[i];
+        for(uint8_t bit = 0; bit < 8; bit++){
+            crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+        }
+    }
+    return crc;
+}
+
+/**
+ * @brief Codifica una distancia en decimas de cm para el protocolo
+ *
+ * @param cm Distancia en centímetros
+ * @return uint16_t Distancia codificada
+ */
+uint16_t encodeDistance(float cm){
+    if(cm < 0 || cm >= 6553.0){
+        return DISTANCE_OUT_OF_RANGE;
+    }
+    return (uint16_t)(cm * 10);
+}
+
 /**
  * @brief Estructura para definir un sensor ultrasónico
  */
@@ -61,14 +119,65 @@ class RaspberryPi
 {
     private:
     bool stop;              //!< Estado actual
-    bool stopPulse;         //!<  Estado de pulso para 'S'
-    bool resumePulse;       //!< Estado de pulso para 'R'
+    bool stopPulse;         //!<  Estado de pulso para STOP
+    bool resumePulse;       //!< Estado de pulso para RESUME
+    uint8_t stopSeq;        //!< Seq del STOP a confirmar
+    uint8_t resumeSeq;      //!< Seq del RESUME a confirmar
+    uint8_t txSeq;          //!< Seq de la proxima trama enviada
+
+    RxState rxState;        //!< Estado del parser
+    uint8_t rxType;         //!< Tipo de la trama en curso
+    uint8_t rxSeq;          //!< Seq de la trama en curso
+    uint8_t rxLen;          //!< Largo del payload de la trama en curso
+    uint8_t rxIndex;        //!< Bytes de payload recibidos
+    uint8_t rxPayload[FRAME_MAX_PAYLOAD]; //!< Payload de la trama en curso
+
+    /**
+     * @brief Aplica un comando recibido
+     *
+     * @param type Tipo de mensaje
+     * @param seq Seq de la trama (para el ACK)
+     */
+    void handleCommand(uint8_t type, uint8_t seq){
+        if(type == MSG_STOP){
+            stop = true;
+            stopPulse = true;
+            stopSeq = seq;
+        }
+        else if(type == MSG_RESUME){
+            stop = false;
+            resumePulse = true;
+            resumeSeq = seq;
+        }
+    }
+
+    /**
+     * @brief Envia una trama a la Raspberry Pi
+     *
+     * @param type Tipo de mensaje
+     * @param payload Datos del mensaje
+     * @param len Largo del payload
+     */
+    void sendFrame(uint8_t type, const uint8_t* payload, uint8_t len){
+        uint8_t header[4] = {FRAME_SYNC, type, txSeq++, len};
+        uint8_t crc = crc8(header + 1, 3, 0);
+        crc = crc8(payload, len, crc);
+        Serial.write(header, 4);
+        if(len > 0){
+            Serial.write(payload, len);
+        }
+        Serial.write(crc);
+    }
 
     public:
-    RaspberryPi(): stop(true), stopPulse(false), resumePulse(false) {} // parte detenido
+    RaspberryPi(): stop(true), stopPulse(false), resumePulse(false),
+        stopSeq(0), resumeSeq(0), txSeq(0), rxState(RX_SYNC),
+        rxType(0), rxSeq(0), rxLen(0), rxIndex(0) {} // parte detenido
     ~RaspberryPi(){}
 
     bool getStop() const { return stop; }
+    uint8_t getStopSeq() const { return stopSeq; }
+    uint8_t getResumeSeq() const { return resumeSeq; }
 
     bool consumeStopPulse(){
         if(!stopPulse) return false;
@@ -82,20 +191,112 @@ class RaspberryPi
         return true;
     }
 
-    // S para detener, R para reanudar
+    /**
+     * @brief Lee y decodifica las tramas entrantes (STOP/RESUME).
+     * Con SERIAL_TEXT_COMMANDS, fuera de una trama tambien acepta 'S' y 'R'
+     * en texto; desactivado por defecto, porque tras una desincronizacion un
+     * byte suelto de una trama podria interpretarse como comando.
+     */
     void readStopCommand(){
         while (Serial.available() > 0) {
-            int command = Serial.read();
-            if(command == STOP_SIGNAL){
-                stop = true;
-                stopPulse = true;
-            }
-            else if(command == RESUME_SIGNAL){
-                stop = false;
-                resumePulse = true;
+            uint8_t data = Serial.read();
+            switch(rxState){
+                case RX_SYNC:
+                    if(data == FRAME_SYNC){
+                        rxState = RX_TYPE;
+                    }
+#if SERIAL_TEXT_COMMANDS
+                    else if(data == STOP_SIGNAL){
+                        handleCommand(MSG_STOP, 0);
+                    }
+                    else if(data == RESUME_SIGNAL){
+                        handleCommand(MSG_RESUME, 0);
+                    }
+#endif
+                    break;
+                case RX_TYPE:
+                    rxType = data;
+                    rxState = RX_SEQ;
+                    break;
+                case RX_SEQ:
+                    rxSeq = data;
+                    rxState = RX_LEN;
+                    break;
+                case RX_LEN:
+                    rxLen = data;
+                    rxIndex = 0;
+                    if(rxLen > FRAME_MAX_PAYLOAD){
+                        rxState = RX_SYNC;
+                    }
+                    else {
+                        rxState = (rxLen > 0) ? RX_PAYLOAD : RX_CRC;
+                    }
+                    break;
+                case RX_PAYLOAD:
+                    rxPayload[rxIndex++] = data;
+                    if(rxIndex >= rxLen){
+                        rxState = RX_CRC;
+                    }
+                    break;
+                case RX_CRC: {
+                    uint8_t header[3] = {rxType, rxSeq, rxLen};
+                    uint8_t crc = crc8(header, 3, 0);
+                    crc = crc8(rxPayload, rxLen, crc);
+                    if(crc == data){
+                        handleCommand(rxType, rxSeq);
+                    }
+                    rxState = RX_SYNC;
+                    break;
+                }
             }
         }
     }
+
+    /**
+     * @brief Confirma un comando recibido
+     *
+     * @param type Tipo del comando confirmado
+     * @param seq Seq del comando confirmado
+     */
+    void sendAck(uint8_t type, uint8_t seq){
+        uint8_t payload[2] = {type, seq};
+        sendFrame(MSG_ACK, payload, 2);
+    }
+
+    /**
+     * @brief Envia una medicion de distancia
+     *
+     * @param cm Distancia en centímetros
+     */
+    void sendDistance(float cm){
+        uint16_t value = encodeDistance(cm);
+        uint8_t payload[2] = {(uint8_t)(value & 0xFF), (uint8_t)(value >> 8)};
+        sendFrame(MSG_DISTANCE, payload, 2);
+    }
+
+    /**
+     * @brief Envia las distancias medidas al escanear izquierda/derecha
+     *
+     * @param left Distancia izquierda en cm
+     * @param right Distancia derecha en cm
+     */
+    void sendScan(float left, float right){
+        uint16_t l = encodeDistance(left);
+        uint16_t r = encodeDistance(right);
+        uint8_t payload[4] = {(uint8_t)(l & 0xFF), (uint8_t)(l >> 8), (uint8_t)(r & 0xFF), (uint8_t)(r >> 8)};
+        sendFrame(MSG_SCAN, payload, 4);
+    }
+
+    /**
+     * @brief Envia un cambio de estado de movimiento
+     *
+     * @param state Nuevo estado
+     * @param direction Dirección de giro (relevante en TURNING)
+     */
+    void sendState(uint8_t state, uint8_t direction){
+        uint8_t payload[2] = {state, direction};
+        sendFrame(MSG_STATE, payload, 2);
+    }
 };
 
 /**
@@ -113,6 +314,9 @@ class ArduinoRobot
         ultraSonic sonic_sensor; //!< Sensor ultrasónico
         servoMotor servo_motor; //!< Servomotor
 
+        float lastLeftDistance; //!< Distancia izquierda del último escaneo
+        float lastRightDistance; //!< Distancia derecha del último escaneo
+
         /**
          * @brief Limita la velocidad del motor al rango válido (0-255)
          *
@@ -160,7 +364,8 @@ class ArduinoRobot
          */
         ArduinoRobot(ultraSonic us, servoMotor sm):
             motor_l1(1), motor_l2(2), motor_r1(3), motor_r2(4),
-            sonic_sensor(us), servo_motor(sm) {}
+            sonic_sensor(us), servo_motor(sm),
+            lastLeftDistance(0), lastRightDistance(0) {}
 
         /**
          * @brief Destructor del robot Arduino
@@ -255,10 +460,6 @@ class ArduinoRobot
             }
             float distance = (duration * SOUND_SPEED) / 2;
 
-            Serial.print("Distance: ");
-            Serial.print(distance);
-            Serial.println(" cm");
-
             return distance;
         }
 
@@ -290,21 +491,27 @@ class ArduinoRobot
             // Volver al centro (90°)
             setServoAngle(90);
 
-            Serial.print("Izq: ");
-            Serial.print(leftDistance);
-            Serial.print(" cm | Der: ");
-            Serial.print(rightDistance);
-            Serial.println(" cm");
+            lastLeftDistance = leftDistance;
+            lastRightDistance = rightDistance;
 
             if(leftDistance > rightDistance){
-                Serial.println("Elegido: IZQUIERDA");
                 return LEFT;
             }
             else {
-                Serial.println("Elegido: DERECHA");
                 return RIGHT;
             }
         }
+
+        /**
+         * @brief Distancias medidas en el último escaneo
+         *
+         * @param left Distancia izquierda (salida)
+         * @param right Distancia derecha (salida)
+         */
+        void getLastScan(float &left, float &right) const {
+            left = lastLeftDistance;
+            right = lastRightDistance;
+        }
 };
 
 /**
@@ -316,19 +523,32 @@ servoMotor servoMotor = {Servo(), SERVO_PIN};
 ArduinoRobot robot(sonicSensor, servoMotor);
 RaspberryPi raspberryPi;
 
-RotationDirection chosenDirection;
+RotationDirection chosenDirection = RIGHT;
 unsigned long turnStartTime = 0;
 
 float distance = 0.0;
 
 State currentState = ADVANCING;
 
+/**
+ * @brief Cambia el estado de movimiento e informa el cambio a la Raspberry Pi
+ *
+ * @param newState Nuevo estado
+ */
+void setState(State newState){
+    if(newState == currentState){
+        return;
+    }
+    currentState = newState;
+    raspberryPi.sendState(currentState, chosenDirection);
+}
+
 /**
  * @brief Inicialización del arduino
  *
  */
 void setup(){
-    Serial.begin(9600);
+    Serial.begin(SERIAL_BAUD);
     robot.init();
     currentState = DETAINED; // Se inicializa detenido
 }
@@ -342,17 +562,17 @@ void loop(){
 
     raspberryPi.readStopCommand();
 
-    // Si llega stop, detiene
+    // Si llega stop, detiene y confirma
     if(raspberryPi.consumeStopPulse()){
-        currentState = DETAINED;
+        setState(DETAINED);
         robot.stop();
-        Serial.write(SERIAL_HANDSHAKE); // 'K'
+        raspberryPi.sendAck(MSG_STOP, raspberryPi.getStopSeq());
     }
 
-    // Si llega resume, arranca
+    // Si llega resume, arranca y confirma
     if(raspberryPi.consumeResumePulse()){
-        Serial.println("Reanudando operaciones...");
-        currentState = ADVANCING;
+        setState(ADVANCING);
+        raspberryPi.sendAck(MSG_RESUME, raspberryPi.getResumeSeq());
     }
     // Si esta detenido por senhal, no hace nada
     if(currentState == DETAINED || raspberryPi.getStop()){
@@ -362,12 +582,12 @@ void loop(){
     }
 
     distance = robot.measure_distance();
+    raspberryPi.sendDistance(distance);
 
     switch(currentState){
         case ADVANCING:
             if(distance < MAX_DISTANCE){
-                Serial.println("obstaculo detectado a " + String(distance) + " cm, revirtiendo...");
-                currentState = REVERSING;
+                setState(REVERSING);
                 robot.stop();
             }
             else {
@@ -381,9 +601,11 @@ void loop(){
             }
             else {
                 robot.stop();
-                Serial.println("Analizando camino...");
                 chosenDirection = robot.chooseTurnDirection();
-                currentState = TURNING;
+                float leftDistance, rightDistance;
+                robot.getLastScan(leftDistance, rightDistance);
+                raspberryPi.sendScan(leftDistance, rightDistance);
+                setState(TURNING);
                 turnStartTime = millis();
             }
             break;
@@ -398,8 +620,7 @@ void loop(){
                 }
             }
             else {
-                Serial.println("Reanudando avance\n");
-                currentState = ADVANCING;
+                setState(ADVANCING);
             }
             break;
 
@@ -0,0 +1,110 @@
+"""
+Benchmark de punta a punta: aumenta la cantidad de robots simulados
+concurrentes y reporta p50/p95/p99 del tiempo hasta el primer audio y
+los turnos por segundo de cada nivel.
+
+    python bench/run_bench.py --robots 1,2,4,8 --turns 5 --speed 4
+
+Con --json se guarda el resultado para comparar una corrida contra otra.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from sim_client import SimulatedRobot, load_wav
+
+
+DEFAULT_WAV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api", "data", "audio.wav")
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+async def run_robot(args, samples, results, startDelay):
+    await asyncio.sleep(startDelay)
+    robot = SimulatedRobot(args.url, args.token, samples, speed=args.speed, codec=args.codec)
+    try:
+        await robot.connect()
+    except Exception as e:
+        print(f"No se pudo conectar un robot simulado: {e}")
+        return
+    try:
+        for _ in range(args.turns):
+            results.append(await robot.run_turn(timeout=args.timeout))
+    finally:
+        await robot.close()
+
+
+async def run_level(args, samples, robots):
+    """
+    Corre `robots` robots a la vez, cada uno con `args.turns` turnos seguidos.
+    """
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_robot(args, samples, results, i * args.stagger)
+        for i in range(robots)
+    ))
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r.error is None and r.first_audio is not None]
+    return {
+        "robots": robots,
+        "turns": len(results),
+        "errors": len(results) - len(ok),
+        "queued": sum(1 for r in results if r.queue_position),
+        "elapsed_s": elapsed,
+        "throughput_turns_s": len(ok) / elapsed if elapsed > 0 else 0.0,
+        "first_audio_s": percentiles([r.first_audio for r in ok]),
+        "total_s": percentiles([r.total for r in ok if r.total is not None]),
+    }
+
+
+def print_level(level):
+    fa = level["first_audio_s"]
+    fmt = lambda v: "-" if v is None else f"{v * 1000:.0f}ms"
+    print(
+        f"robots={level['robots']:<3} turnos={level['turns']:<4} errores={level['errors']:<3} "
+        f"en_cola={level['queued']:<3} "
+        f"primer_audio p50={fmt(fa['p50'])} p95={fmt(fa['p95'])} p99={fmt(fa['p99'])} "
+        f"throughput={level['throughput_turns_s']:.2f} turnos/s"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de Kubibot con robots simulados")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--token", default=os.getenv("API_TOKEN", "bench"))
+    parser.add_argument("--wav", default=DEFAULT_WAV, help="audio del comando a reproducir")
+    parser.add_argument("--robots", default="1,2,4,8", help="niveles de concurrencia, separados por coma")
+    parser.add_argument("--turns", type=int, default=5, help="turnos por robot en cada nivel")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = tiempo real, 0 = sin esperas")
+    parser.add_argument("--stagger", type=float, default=0.05, help="segundos entre la llegada de cada robot")
+    parser.add_argument("--codec", default="zlib", choices=("pcm", "zlib", "opus"))
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="archivo donde guardar los resultados")
+    args = parser.parse_args()
+
+    samples = load_wav(args.wav)
+    levels = []
+    for robots in (int(n) for n in args.robots.split(",")):
+        level = await run_level(args, samples, robots)
+        print_level(level)
+        levels.append(level)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"args": vars(args), "levels": levels}, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
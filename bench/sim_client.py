@@ -0,0 +1,143 @@
+import asyncio
+import os
+import sys
+import time
+import uuid
+import wave
+
+import numpy as np
+import socketio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api", "client"))
+
+from audio.uplink import UplinkEncoder
+
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512  # Igual que Porcupine/pvrecorder en el cliente real
+
+
+def load_wav(path):
+    """
+    Lee un WAV y lo deja como PCM int16 mono a 16 kHz, como lo captura el robot.
+    """
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError("Solo se soporta audio de 16 bits")
+        channels = wf.getnchannels()
+        rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    if rate != SAMPLE_RATE:
+        length = int(round(len(samples) * SAMPLE_RATE / rate))
+        positions = np.linspace(0, len(samples) - 1, length)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+    return samples
+
+
+class TurnResult:
+    """
+    Tiempos de un turno simulado, en segundos desde el `end_of_audio`.
+    """
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.first_audio = None
+        self.total = None
+        self.error = None
+        self.queue_position = None
+
+
+class SimulatedRobot:
+    """
+    Robot simulado: reproduce un WAV por el mismo protocolo Socket.IO que
+    el cliente real (`audio_chunk` agrupados y `end_of_audio`) y mide el
+    tiempo hasta el primer audio de la respuesta y hasta el chunk final.
+
+    `speed` acelera el envio (1.0 = tiempo real, 0 = sin esperas).
+    """
+
+    def __init__(self, url, token, samples, speed=1.0, codec="zlib", batch_ms=160):
+        self.url = url
+        self.token = token
+        self.samples = samples
+        self.speed = speed
+        self.codec = codec
+        self.batch_ms = batch_ms
+
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.turn = 0
+        self.result = None
+        self.sent_at = None
+        self.done = None
+
+        self.sio.on('audio_response_chunk', self._on_audio_chunk)
+        self.sio.on('response', self._on_response)
+        self.sio.on('busy', self._on_busy)
+
+    async def connect(self):
+        await self.sio.connect(self.url, headers={'Auth': self.token}, wait_timeout=10)
+
+    async def close(self):
+        await self.sio.disconnect()
+
+    def _is_current(self, data):
+        return self.done is not None and data.get('turn') == self.turn
+
+    async def _on_audio_chunk(self, data):
+        if not self._is_current(data):
+            return
+        now = time.perf_counter()
+        if data.get('audio') and self.result.first_audio is None:
+            self.result.first_audio = now - self.sent_at
+        if data.get('final'):
+            self.result.total = now - self.sent_at
+            if not self.done.done():
+                self.done.set_result(None)
+
+    async def _on_response(self, data):
+        if self._is_current(data) and 'error' in data:
+            self.result.error = data['error']
+
+    async def _on_busy(self, data):
+        if self.result is not None:
+            self.result.queue_position = data.get('posicion')
+
+    async def run_turn(self, timeout=60.0):
+        """
+        Envia el WAV completo como un comando de voz y espera la respuesta.
+        """
+        self.turn += 1
+        self.result = TurnResult(uuid.uuid4().hex[:16])
+        self.done = asyncio.get_running_loop().create_future()
+
+        outbox = []
+        uplink = UplinkEncoder(outbox.append, codec=self.codec, batch_ms=self.batch_ms, sample_rate=SAMPLE_RATE)
+        frameSeconds = FRAME_LENGTH / SAMPLE_RATE
+        start = time.perf_counter()
+
+        for i in range(0, len(self.samples), FRAME_LENGTH):
+            uplink.push(self.samples[i:i + FRAME_LENGTH])
+            for packet in outbox:
+                await self.sio.emit('audio_chunk', packet)
+            outbox.clear()
+
+            if self.speed > 0:
+                # Se respeta el ritmo del microfono (escalado por speed)
+                target = start + (i // FRAME_LENGTH + 1) * frameSeconds / self.speed
+                await asyncio.sleep(max(0.0, target - time.perf_counter()))
+
+        uplink.flush()
+        for packet in outbox:
+            await self.sio.emit('audio_chunk', packet)
+
+        self.sent_at = time.perf_counter()
+        await self.sio.emit('end_of_audio', {'turn': self.turn, 'trace': self.result.trace_id})
+
+        try:
+            await asyncio.wait_for(self.done, timeout)
+        except asyncio.TimeoutError:
+            self.result.error = "timeout"
+        return self.result
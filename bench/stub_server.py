@@ -0,0 +1,45 @@
+"""
+Levanta el servidor real (server_api.py) con motores STT/LLM/TTS falsos,
+para medir el pipeline sin Whisper, Ollama ni Piper.
+
+    python bench/stub_server.py [--stt faster-whisper] [--llm ollama] [--tts piper]
+
+Cada etapa usa el motor "stub" salvo que se indique otro del registro
+(services/backends.py), para comparar motores reales uno contra otro.
+
+Las latencias de los servicios falsos se configuran con BENCH_STT_LATENCY,
+BENCH_LLM_FIRST_LATENCY, BENCH_LLM_SENTENCE_LATENCY y BENCH_TTS_LATENCY
+(ver bench/stubs.py).
+"""
+import argparse
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(BENCH_DIR, "..", "api", "server")
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, SERVER_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de Kubibot con servicios falsos")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--stt", default="stub", help="motor STT (por defecto stub)")
+    parser.add_argument("--llm", default="stub", help="motor LLM (por defecto stub)")
+    parser.add_argument("--tts", default="stub", help="motor TTS (por defecto stub)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("API_TOKEN", "bench")
+    os.environ["STT_BACKEND"] = args.stt
+    os.environ["LLM_BACKEND"] = args.llm
+    os.environ["TTS_BACKEND"] = args.tts
+
+    import stubs  # Registra los motores "stub"
+    import server_api
+    server_api.socketio.start_background_task(server_api.warm_up_pipeline)
+    server_api.socketio.run(server_api.app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import io
+import math
+import os
+import random
+import time
+import wave
+
+from services.backends import register_stt, register_llm, register_tts, STTBackend, LLMBackend, TTSBackend
+
+
+class Latency:
+    """
+    Distribucion de latencia configurable desde texto:
+
+    - "fixed:200"           siempre 200 ms
+    - "uniform:100:300"     uniforme entre 100 y 300 ms
+    - "normal:250:50"       normal de media 250 ms y desviacion 50 ms
+    - "lognormal:250:0.4"   log-normal de mediana 250 ms y sigma 0.4 (colas largas)
+    """
+
+    def __init__(self, spec):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Distribucion de latencia desconocida: {spec}")
+
+    def sample(self):
+        """
+        Una muestra de la distribucion, en segundos.
+        """
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = random.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            ms = random.gauss(self.params[0], self.params[1])
+        else:
+            ms = self.params[0] * math.exp(random.gauss(0, self.params[1]))
+        return max(0.0, ms) / 1000
+
+    def sleep(self):
+        time.sleep(self.sample())
+
+
+# Latencias por defecto, sobreescribibles con variables de entorno
+STT_LATENCY = Latency(os.getenv("BENCH_STT_LATENCY", "lognormal:300:0.3"))
+LLM_FIRST_LATENCY = Latency(os.getenv("BENCH_LLM_FIRST_LATENCY", "lognormal:400:0.3"))
+LLM_SENTENCE_LATENCY = Latency(os.getenv("BENCH_LLM_SENTENCE_LATENCY", "normal:250:50"))
+TTS_LATENCY = Latency(os.getenv("BENCH_TTS_LATENCY", "normal:120:30"))
+
+STUB_TRANSCRIPT = "¿Cómo te llamas?"
+STUB_ANSWER = ["Me llamo Kubibot.", "Soy un robot asistente de la universidad."]
+TTS_SAMPLE_RATE = 22050
+# Duracion del audio sintetizado por caracter, similar a una voz real
+TTS_SECONDS_PER_CHAR = 0.06
+
+
+@register_stt("stub")
+class StubSTT(STTBackend):
+    """
+    Transcripcion falsa: espera una latencia de STT_LATENCY y devuelve un texto fijo.
+    """
+
+    def transcribe(self, pcm):
+        STT_LATENCY.sleep()
+        if not pcm:
+            raise ValueError("Whisper no pudo entender el audio")
+        return STUB_TRANSCRIPT
+
+
+@register_llm("stub")
+class StubLLM(LLMBackend):
+    """
+    Respuesta falsa entregada oracion por oracion con latencias de LLM.
+    """
+
+    def stream_answer(self, session_id, prompt, record=True):
+        for i, sentence in enumerate(STUB_ANSWER):
+            (LLM_FIRST_LATENCY if i == 0 else LLM_SENTENCE_LATENCY).sleep()
+            yield sentence
+
+
+@register_tts("stub")
+class StubTTS(TTSBackend):
+    """
+    Sintesis falsa: silencio de duracion proporcional al texto.
+    """
+
+    def synthesize(self, text):
+        if not text:
+            return None
+        TTS_LATENCY.sleep()
+        samples = int(len(text) * TTS_SECONDS_PER_CHAR * TTS_SAMPLE_RATE)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(TTS_SAMPLE_RATE)
+            wf.writeframes(bytes(2 * samples))
+        return buffer.getvalue()
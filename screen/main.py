@@ -1,10 +1,14 @@
 import pygame
 import yaml
 import sys
+import os
+import json
 import random
+import socket
+import threading
 
-""" cargar configuración desde config.yaml """
-with open('emotions/config.yaml', 'r') as file:
+""" cargar configuración desde config.yaml (junto a este archivo) """
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.yaml'), 'r') as file:
     config = yaml.safe_load(file)
 
 COLOR_FONDO = tuple(config['COLOR_FONDO'])
@@ -13,6 +17,8 @@ ANCHO_PANTALLA = config['ANCHO_PANTALLA']
 ALTO_PANTALLA = config['ALTO_PANTALLA']
 ANCHO_PIXEL = config['ANCHO_PIXEL']
 ALTO_PIXEL = config['ALTO_PIXEL']
+# Socket Unix por el que el cliente (raspberry.py) publica su estado
+SOCKET_PANTALLA = config.get('SOCKET_PANTALLA', '/tmp/kubibot-screen.sock')
 
 """ definiciones de las matrices de emociones (frames) """
 CARA_NORMAL = [
@@ -63,63 +69,261 @@ CARA_TRISTE_PARPADEO = [
     [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
 ]
 
+CARA_ESCUCHANDO = [
+    [1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
+    [1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
+    [1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
+    [1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1],
+    [1, 1, 1, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1]
+]
+
+CARA_PENSANDO_IZQUIERDA = [
+    [1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0],
+    [1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 1, 0, 1, 0, 1, 0, 0, 0]
+]
+
+CARA_PENSANDO_DERECHA = [
+    [0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
+    [0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 1, 0, 1, 0, 1, 0, 0, 0]
+]
+
+""" bocas para la animación de habla (de cerrada a abierta) """
+BOCA_CERRADA = [
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 1, 1, 1, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+]
+
+BOCA_MEDIA = [
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 1, 1, 1, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0]
+]
+
+BOCA_ABIERTA = [
+    [0, 0, 0, 0, 1, 1, 1, 1, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 0, 0, 0, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 1, 1, 1, 0, 0, 0, 0, 0]
+]
+
+BOCAS = [BOCA_CERRADA, BOCA_MEDIA, BOCA_ABIERTA]
+
+""" une los ojos de una emoción con una boca, separados por una fila vacía """
+def conBoca(ojos, boca):
+    return ojos + [[0] * len(ojos[0])] + boca
+
 ANIMACIONES = [
     [CARA_NORMAL, CARA_NORMAL_PARPADEO],  # normal con parpadeo
     [CARA_FELIZ, CARA_FELIZ_PARPADEO],     # feliz con parpadeo
-    [CARA_TRISTE, CARA_TRISTE_PARPADEO]   # triste con parpadeo
+    [CARA_TRISTE, CARA_TRISTE_PARPADEO],   # triste con parpadeo
+    [CARA_ESCUCHANDO, CARA_NORMAL_PARPADEO],  # escuchando con parpadeo
+    [CARA_PENSANDO_IZQUIERDA, CARA_PENSANDO_DERECHA],  # pensando
+    [conBoca(CARA_NORMAL, boca) for boca in BOCAS],  # hablando
+    [conBoca(CARA_FELIZ, boca) for boca in BOCAS],   # hablando feliz
+    [conBoca(CARA_TRISTE, boca) for boca in BOCAS]   # hablando triste
 ]
 
+# Milisegundos por frame de las animaciones cíclicas (None: parpadeo aleatorio)
+DURACION_FRAME = [None, None, None, None, 450, 160, 160, 160]
+
+EMOCIONES = {'normal': 0, 'feliz': 1, 'triste': 2}
+ESCUCHANDO = 3
+PENSANDO = 4
+HABLANDO = 5  # + índice de la emoción
+
+# Envolvente de la voz que envía el servidor: un nivel 0-255 cada 20 ms
+MS_ENVOLVENTE = 20
+UMBRALES_BOCA = (40, 110)  # niveles que separan boca cerrada, media y abierta
+
+""" frame de boca (índice en BOCAS) para un nivel de la envolvente """
+def nivelBoca(nivel):
+    if nivel < UMBRALES_BOCA[0]:
+        return 0
+    if nivel < UMBRALES_BOCA[1]:
+        return 1
+    return 2
+
+""" animación que corresponde a un estado publicado por el cliente """
+def animacionDeEstado(estado, emocion):
+    indice_emocion = EMOCIONES.get(emocion, 0)
+    if estado == 'listening':
+        return ESCUCHANDO
+    if estado == 'thinking':
+        return PENSANDO
+    if estado == 'speaking':
+        return HABLANDO + indice_emocion
+    return indice_emocion
+
 emocion_actual = 0
 frame_actual = 0
 
 parpadeando = False
 proximo_parpadeo = 0
 fin_parpadeo = 0
+proximo_cambio = 0
+
+bocas_envolvente = []     # frame de boca por cada ventana de la respuesta en curso
+inicio_envolvente = None  # ticks en que empezó a sonar la respuesta
 
 def reiniciar_parpadeo():
-    global parpadeando, proximo_parpadeo, fin_parpadeo, frame_actual
+    global parpadeando, proximo_parpadeo, fin_parpadeo, frame_actual, proximo_cambio
     parpadeando = False
     frame_actual = 0
     ahora = pygame.time.get_ticks()
     proximo_parpadeo = ahora + random.randint(140, 220)
     fin_parpadeo = 0
+    proximo_cambio = ahora + (DURACION_FRAME[emocion_actual] or 0)
 
-""" dibuja una emoción en la superficie dada """
-def dibujarEmocion(superficie, emocion):
-    superficie.fill(COLOR_FONDO)
+EVENTO_ESTADO = pygame.USEREVENT + 1
+
+""" recibe los estados del cliente y los entrega al bucle como eventos de Pygame """
+def escucharEstados():
+    if os.path.exists(SOCKET_PANTALLA):
+        os.unlink(SOCKET_PANTALLA)
+    receptor = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    receptor.bind(SOCKET_PANTALLA)
+
+    while True:
+        datos = receptor.recv(65536)
+        try:
+            mensaje = json.loads(datos)
+        except ValueError:
+            continue
+        # Despierta al bucle principal de inmediato, sin sondear
+        pygame.event.post(pygame.event.Event(EVENTO_ESTADO, mensaje=mensaje))
 
+""" rectángulo de pantalla que ocupa una emoción (centrado) """
+def rectanguloEmocion(emocion):
     ancho_emocion = len(emocion[0]) * ANCHO_PIXEL
     alto_emocion = len(emocion) * ALTO_PIXEL
+    return pygame.Rect((ANCHO_PANTALLA - ancho_emocion) // 2,
+                       (ALTO_PANTALLA - alto_emocion) // 2,
+                       ancho_emocion,
+                       alto_emocion)
 
-    offset_x = (ANCHO_PANTALLA - ancho_emocion) // 2
-    offset_y = (ALTO_PANTALLA - alto_emocion) // 2
+""" rasteriza una emoción una sola vez en una superficie de su tamaño """
+def rasterizarEmocion(emocion):
+    rect = rectanguloEmocion(emocion)
+    superficie = pygame.Surface(rect.size).convert()
+    superficie.fill(COLOR_FONDO)
 
     for y, fila in enumerate(emocion):
         for x, pixel in enumerate(fila):
             if pixel == 1:
-                rect = (offset_x + x * ANCHO_PIXEL,
-                        offset_y + y * ALTO_PIXEL,
-                        ANCHO_PIXEL,
-                        ALTO_PIXEL)
-                pygame.draw.rect(superficie, COLOR_PIXEL, rect)
+                superficie.fill(COLOR_PIXEL, (x * ANCHO_PIXEL, y * ALTO_PIXEL, ANCHO_PIXEL, ALTO_PIXEL))
+    return superficie
+
+""" copia un frame ya rasterizado y actualiza solo la región que cambió """
+def mostrarFrame(superficie, emocion, rect_anterior=None):
+    rect = rectanguloEmocion(emocion)
+    sucias = [rect]
+    if rect_anterior is not None and rect_anterior != rect:
+        # La emoción anterior ocupaba otra región: se borra
+        screen.fill(COLOR_FONDO, rect_anterior)
+        sucias.append(rect_anterior)
+    screen.blit(superficie, rect)
+    pygame.display.update(sucias)
+    return rect
 
 """ inicialización de Pygame """
 pygame.init()
 screen = pygame.display.set_mode((ANCHO_PANTALLA, ALTO_PANTALLA))
 pygame.display.set_caption("KUBIBOT Emociones")
 screen.fill(COLOR_FONDO)
-clock = pygame.time.Clock()
+pygame.display.flip()
+
+# Cada frame de cada animación se dibuja una sola vez al iniciar
+SUPERFICIES = [[rasterizarEmocion(frame) for frame in frames] for frames in ANIMACIONES]
+
 reiniciar_parpadeo()
+threading.Thread(target=escucharEstados, daemon=True).start()
 
 """ Bucle principal """
 running = True
+frame_mostrado = None
+rect_mostrado = None
 while running:
-    dt = clock.tick(60)
     ahora = pygame.time.get_ticks()
 
-    for event in pygame.event.get():
+    frames = ANIMACIONES[emocion_actual]
+    hablando_con_envolvente = emocion_actual >= HABLANDO and bool(bocas_envolvente)
+    if hablando_con_envolvente:
+        # La boca sigue a la envolvente según el tiempo desde que empezó a sonar
+        if inicio_envolvente is None:
+            frame_actual = 0
+        else:
+            posicion = (ahora - inicio_envolvente) // MS_ENVOLVENTE
+            frame_actual = bocas_envolvente[posicion] if posicion < len(bocas_envolvente) else 0
+    elif DURACION_FRAME[emocion_actual]:
+        # Animación cíclica: avanza un frame cada DURACION_FRAME ms
+        if ahora >= proximo_cambio:
+            frame_actual = (frame_actual + 1) % len(frames)
+            proximo_cambio = ahora + DURACION_FRAME[emocion_actual]
+    elif len(frames) > 1:
+        if not parpadeando and ahora >= proximo_parpadeo:
+            parpadeando = True
+            frame_actual = 1
+            fin_parpadeo = ahora + random.randint(140, 220)
+        elif parpadeando and ahora >= fin_parpadeo:
+            parpadeando = False
+            frame_actual = 0
+            proximo_parpadeo = ahora + random.randint(700, 1600)
+    else:
+        frame_actual = 0
+
+    # Solo se redibuja cuando cambia el frame
+    if frame_mostrado != (emocion_actual, frame_actual):
+        rect_mostrado = mostrarFrame(SUPERFICIES[emocion_actual][frame_actual], frames[frame_actual], rect_mostrado)
+        frame_mostrado = (emocion_actual, frame_actual)
+
+    # Se duerme hasta el próximo cambio de frame (o hasta que llegue un evento)
+    if hablando_con_envolvente and inicio_envolvente is not None:
+        # Próxima ventana en que cambia la boca
+        siguiente = max(0, (pygame.time.get_ticks() - inicio_envolvente) // MS_ENVOLVENTE) + 1
+        while siguiente < len(bocas_envolvente) and bocas_envolvente[siguiente] == frame_actual:
+            siguiente += 1
+        if siguiente < len(bocas_envolvente):
+            plazo = inicio_envolvente + siguiente * MS_ENVOLVENTE
+            evento = pygame.event.wait(max(1, plazo - pygame.time.get_ticks()))
+        elif frame_actual != 0:
+            # Al terminar la envolvente se cierra la boca
+            plazo = inicio_envolvente + len(bocas_envolvente) * MS_ENVOLVENTE
+            evento = pygame.event.wait(max(1, plazo - pygame.time.get_ticks()))
+        else:
+            evento = pygame.event.wait()
+    elif hablando_con_envolvente:
+        evento = pygame.event.wait()
+    elif DURACION_FRAME[emocion_actual]:
+        evento = pygame.event.wait(max(1, proximo_cambio - pygame.time.get_ticks()))
+    elif len(frames) > 1:
+        plazo = fin_parpadeo if parpadeando else proximo_parpadeo
+        evento = pygame.event.wait(max(1, plazo - pygame.time.get_ticks()))
+    else:
+        evento = pygame.event.wait()
+
+    for event in [evento] + pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+        if event.type == EVENTO_ESTADO:
+            animacion = animacionDeEstado(event.mensaje.get('estado'), event.mensaje.get('emocion'))
+            if animacion != emocion_actual:
+                if not (emocion_actual >= HABLANDO and animacion >= HABLANDO):
+                    # Empieza o termina una respuesta: se descarta la envolvente anterior
+                    bocas_envolvente = []
+                    inicio_envolvente = None
+                emocion_actual = animacion
+                reiniciar_parpadeo()
+            if 'envolvente' in event.mensaje:
+                # Se convierte una sola vez a frames de boca; el bucle solo indexa
+                bocas_envolvente.extend(nivelBoca(nivel) for nivel in event.mensaje['envolvente'])
+            if event.mensaje.get('reproduciendo'):
+                inicio_envolvente = pygame.time.get_ticks()
         if event.type == pygame.KEYDOWN:
             # Mapea teclas a emociones específicas
             if event.key == pygame.K_a:
@@ -132,21 +336,5 @@ while running:
                 emocion_actual = 2  # triste
                 reiniciar_parpadeo()
 
-    frames = ANIMACIONES[emocion_actual]
-    if len(frames) > 1:
-        if not parpadeando and ahora >= proximo_parpadeo:
-            parpadeando = True
-            frame_actual = 1
-            fin_parpadeo = ahora + random.randint(140, 220)
-        elif parpadeando and ahora >= fin_parpadeo:
-            parpadeando = False
-            frame_actual = 0
-            proximo_parpadeo = ahora + random.randint(700, 1600)
-    else:
-        frame_actual = 0
-
-    dibujarEmocion(screen, frames[frame_actual])
-    pygame.display.flip()
-
 pygame.quit()
-sys.exit()
\ No newline at end of file
+sys.exit()